@@ -0,0 +1,182 @@
+"""Headless load benchmark for the Streamlit pages.
+
+Seeds a local SQLite database for each data size, then drives Home, the four
+Food Waste Management tabs and Contact through Streamlit's AppTest. For every
+page it reports, as JSON:
+
+  - render latency: cold (first run in the process) and p50/p95/max of the warm reruns
+  - queries per rerun: calls and cache hits from the metrics registry
+  - peak Python memory of one rerun (tracemalloc)
+  - throughput: reruns per second with --concurrency sessions rerunning at once
+
+    python bench/load.py --sizes 1000 100000 --reruns 20 --concurrency 50 --out load.json
+
+A size N seeds N listings and N claims, plus N/10 providers and receivers
+(at least 100 of each).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+#the sidebar and tab menus are custom components AppTest cannot click, so each page gets a script that renders it directly
+PAGE_SCRIPT = """
+from fwms.pages import render_page
+render_page({page!r})
+"""
+TAB_SCRIPT = """
+from fwms.metrics import page_render
+from fwms.pages.management import TABS
+with page_render({name!r}):
+    TABS[{tab!r}][1]()
+"""
+
+PAGES = {
+    "Home": PAGE_SCRIPT.format(page="Home"),
+    "Contact": PAGE_SCRIPT.format(page="Contact"),
+}
+for _tab in ["Food Listings", "Manage Food Claims", "Listing Details", "Data Visualisations"]:
+    PAGES[f"Food Waste Management / {_tab}"] = TAB_SCRIPT.format(name=f"Food Waste Management / {_tab}", tab=_tab)
+
+TIMEOUT = 120
+
+
+def configure(db_path, reports_path):
+    #point the app at the seeded database and its own report snapshots, and start from empty process-wide caches
+    import streamlit as st
+    from fwms.metrics import REGISTRY
+
+    os.environ["FWMS_BACKEND"] = "sqlite"
+    os.environ["FWMS_SQLITE_PATH"] = db_path
+    os.environ["FWMS_CHANGE_SOURCE"] = "local"
+    os.environ["FWMS_LIFECYCLE"] = "off"
+    #a fresh directory per size, so no size reads a snapshot of another size's data
+    os.environ["FWMS_REPORTS_PATH"] = reports_path
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    REGISTRY.reset()
+
+
+def run_once(script):
+    #one fresh session running the page once; returns (seconds, query deltas, errors)
+    from streamlit.testing.v1 import AppTest
+    from fwms.metrics import REGISTRY
+
+    app = AppTest.from_string(script, default_timeout=TIMEOUT)
+    before = REGISTRY.totals()
+    started = time.perf_counter()
+    app.run()
+    seconds = time.perf_counter() - started
+    after = REGISTRY.totals()
+    errors = len(app.exception) + len(app.error)
+    return seconds, {key: after[key] - before[key] for key in after}, errors
+
+
+def bench_page(script, reruns):
+    cold, _, _ = run_once(script)
+    latencies, calls, hits, errors = [], [], [], 0
+    for _ in range(reruns):
+        seconds, queries, failed = run_once(script)
+        latencies.append(seconds)
+        calls.append(queries["calls"])
+        hits.append(queries["cache_hits"])
+        errors += failed
+
+    tracemalloc.start()
+    run_once(script)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return {
+        "cold_ms": round(cold * 1000, 2),
+        "p50_ms": round(statistics.median(ordered) * 1000, 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+        "queries_per_rerun": round(statistics.mean(calls), 2),
+        "cache_hits_per_rerun": round(statistics.mean(hits), 2),
+        "peak_kb": round(peak / 1024, 1),
+        "errors": errors,
+    }
+
+
+def bench_throughput(concurrency, reruns):
+    #concurrency sessions, each rerunning every page in turn
+    scripts = list(PAGES.values())
+
+    def operator(_):
+        failed = 0
+        for i in range(reruns):
+            failed += run_once(scripts[i % len(scripts)])[2]
+        return failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        errors = sum(pool.map(operator, range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "sessions": concurrency,
+        "reruns": concurrency * reruns,
+        "seconds": round(seconds, 2),
+        "reruns_per_s": round(concurrency * reruns / seconds, 2),
+        "errors": errors,
+    }
+
+
+def bench_size(size, reruns, concurrency, workdir):
+    from fwms.metrics import REGISTRY
+    from fwms.seed import seed
+
+    db_path = os.path.join(workdir, f"bench_{size}.db")
+    started = time.perf_counter()
+    seed(db_path, n_providers=max(100, size // 10), n_receivers=max(100, size // 10),
+         n_listings=size, n_claims=size, replace=True)
+    seeded = time.perf_counter() - started
+
+    configure(db_path, os.path.join(workdir, f"reports_{size}"))
+    pages = {name: bench_page(script, reruns) for name, script in PAGES.items()}
+    slowest_queries = REGISTRY.top_queries(10, by="p95")
+    throughput = bench_throughput(concurrency, reruns) if concurrency else None
+    return {
+        "seed_s": round(seeded, 2),
+        "pages": pages,
+        "throughput": throughput,
+        "slowest_queries": slowest_queries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--reruns", type=int, default=10, help="warm reruns per page (and per session for throughput)")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent sessions for the throughput run, 0 to skip it")
+    parser.add_argument("--out", help="write the JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {
+            "sizes": {str(size): bench_size(size, args.reruns, args.concurrency, workdir) for size in args.sizes},
+        }
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    results["total_s"] = round(time.perf_counter() - started, 2)
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
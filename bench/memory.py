@@ -0,0 +1,71 @@
+"""Peak memory of the Contact and Read Claims table paths as the tables grow.
+
+For each size a local SQLite database is seeded, then every scenario runs in
+a fresh interpreter and reports its peak RSS, as JSON:
+
+    python bench/memory.py [--sizes 10000 100000 1000000]
+
+"full" is the old path (the whole table into one DataFrame). "page" fetches
+one projected grid page, and "stream" writes the whole table to CSV through
+fetchmany chunks. Only "full" should grow with the table.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHILD = """
+import json, os, resource, sys
+sys.path.insert(0, {root!r})
+from fwms.db import run_query
+from fwms.tables import CLAIMS, PROVIDERS, RECEIVERS, fetch_page, write_csv
+
+views = {{"providers": PROVIDERS, "receivers": RECEIVERS, "claims": CLAIMS}}
+view = views[sys.argv[2]]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.argv[1] == "full":
+    rows = len(run_query(f"select * from {{view.table}}", ttl=0))
+elif sys.argv[1] == "page":
+    rows = len(fetch_page(view, list(view.columns), None, 500, ttl=0)[0])
+else:
+    rows = write_csv(view, list(view.columns), os.devnull)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"rows": rows, "peak_rss_mb": round(peak / 1024, 1), "over_baseline_mb": round((peak - baseline) / 1024, 1)}}))
+"""
+
+SCENARIOS = ["full", "page", "stream"]
+TABLES = ["providers", "receivers", "claims"]
+
+
+def measure(db_path, scenario, table):
+    env = dict(os.environ, FWMS_BACKEND="sqlite", FWMS_SQLITE_PATH=db_path)
+    out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT), scenario, table], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    from fwms.seed import seed
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            db_path = os.path.join(workdir, f"memory_{size}.db")
+            #every table gets `size` rows, so providers and receivers grow as much as claims
+            seed(db_path, n_providers=size, n_receivers=size, n_listings=max(1000, size // 10), n_claims=size, replace=True)
+            results[str(size)] = {table: {scenario: measure(db_path, scenario, table) for scenario in SCENARIOS}
+                                  for table in TABLES}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Cold-start import benchmark for food.py.
+
+Each scenario imports its modules in a fresh interpreter, several times, and
+the median wall time is reported as JSON:
+
+    python bench/startup.py [--repeat 5]
+
+"eager" is the import block food.py used to run on every script run, "lazy"
+is what it imports now, and the page scenarios add what opening each page
+costs on top of that.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#everything food.py imports at module level; keep in step with it
+LAZY = ["streamlit", "streamlit_option_menu", "fwms.pages", "fwms.jobs"]
+
+SCENARIOS = {
+    "eager": ["streamlit", "pandas", "pyodbc", "streamlit_dynamic_filters", "matplotlib.pyplot",
+              "seaborn", "streamlit_option_menu", "plotly.express", "streamlit_card"],
+    "lazy": LAZY,
+    "lazy+home": LAZY + ["fwms.pages.home"],
+    "lazy+management": LAZY + ["fwms.pages.management"],
+    "lazy+contact": LAZY + ["fwms.pages.contact"],
+}
+
+CHILD = """
+import importlib, json, sys, time
+started = time.perf_counter()
+missing = []
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        missing.append(f"{name}: {e}")
+print(json.dumps({"seconds": time.perf_counter() - started, "missing": missing}))
+"""
+
+
+def measure(modules, repeat):
+    timings, missing = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", CHILD, *modules], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out)
+        timings.append(result["seconds"])
+        missing = result["missing"]
+    return {"median_s": round(statistics.median(timings), 4), "min_s": round(min(timings), 4), "missing": missing}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {name: measure(modules, args.repeat) for name, modules in SCENARIOS.items()}
+    eager, lazy = results["eager"]["median_s"], results["lazy"]["median_s"]
+    results["speedup"] = round(eager / lazy, 2) if lazy else None
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""In-process materialized aggregates over claims and food listings.
+
+The store is built once from the database and then kept current by the claim
+CRUD helpers, which apply +1/-1 deltas. Dashboard reads are O(groups).
+
+    python -m fwms.aggregates rebuild   # full rebuild, prints the summary sizes
+    python -m fwms.aggregates check     # compare a rebuilt store with full SQL group-bys
+"""
+import sys
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+import streamlit as st
+
+from fwms.db import run_query
+
+LISTINGS_QUERY = "select f.Food_ID, p.name as ProviderName, f.Meal_Type, f.Quantity from food_listings f left join providers p on p.Provider_ID = f.Provider_ID"
+RECEIVERS_QUERY = "select Receiver_ID, name as ReceiverName from receivers"
+CLAIM_GROUPS_QUERY = "select Food_ID, Receiver_ID, Status, count(*) as Claims from claims group by Food_ID, Receiver_ID, Status"
+
+REBUILD_INTERVAL = 15 * 60
+
+
+class AggregateStore:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built_at = None
+        self.stale = True
+        self.rebuilding = 0              # rebuilds in progress; their source reads may or may not include a write
+        self.missed = False              # a delta was skipped during a rebuild
+
+        #dimension lookups needed to turn a claim row into group keys
+        self.listings = {}               # Food_ID -> (ProviderName, Meal_Type, Quantity)
+        self.receivers = {}              # Receiver_ID -> ReceiverName
+
+        self.status_counts = Counter()           # Status -> claims
+        self.meal_type_claims = Counter()        # Meal_Type -> claims
+        self.completed_by_provider = Counter()   # ProviderName -> completed claims
+        self.receiver_quantity = Counter()       # ReceiverName -> sum of claimed quantity
+        self.receiver_claims = Counter()         # ReceiverName -> claims
+        self.provider_quantity = Counter()       # ProviderName -> listed quantity
+
+    def load(self, listings, receivers, claim_groups):
+        #full rebuild from the three source frames
+        with self._lock:
+            self.listings = {
+                row.Food_ID: (row.ProviderName, row.Meal_Type, row.Quantity)
+                for row in listings.itertuples(index=False)
+            }
+            self.receivers = dict(zip(receivers['Receiver_ID'], receivers['ReceiverName']))
+            for counter in (self.status_counts, self.meal_type_claims, self.completed_by_provider,
+                            self.receiver_quantity, self.receiver_claims, self.provider_quantity):
+                counter.clear()
+
+            for provider, meal_type, quantity in self.listings.values():
+                self.provider_quantity[provider] += quantity
+            for row in claim_groups.itertuples(index=False):
+                self._apply(row.Food_ID, row.Receiver_ID, row.Status, row.Claims)
+
+            self.built_at = time.time()
+            self.stale = False
+
+    def _apply(self, food_id, receiver_id, status, delta):
+        if food_id not in self.listings or receiver_id not in self.receivers:
+            #a listing or receiver we have not seen yet: the next read rebuilds
+            self.stale = True
+            return
+        provider, meal_type, quantity = self.listings[food_id]
+        receiver = self.receivers[receiver_id]
+
+        self.status_counts[status] += delta
+        self.meal_type_claims[meal_type] += delta
+        if status == 'Completed':
+            self.completed_by_provider[provider] += delta
+        self.receiver_quantity[receiver] += quantity * delta
+        self.receiver_claims[receiver] += delta
+
+    def _accepts_deltas(self):
+        #a stale store rebuilds from the database, which already holds the committed write, so the delta is dropped
+        if self.rebuilding:
+            self.missed = True
+            return False
+        return not self.stale
+
+    def apply_claim(self, food_id, receiver_id, status, delta=1):
+        with self._lock:
+            if self._accepts_deltas():
+                self._apply(food_id, receiver_id, status, delta)
+
+    def replace_claim(self, old, new):
+        #old/new: (Food_ID, Receiver_ID, Status); either may be None for insert/delete
+        with self._lock:
+            if not self._accepts_deltas():
+                return
+            if old is not None:
+                self._apply(*old, -1)
+            if new is not None:
+                self._apply(*new, 1)
+
+    def rebuild(self):
+        with self._lock:
+            self.rebuilding += 1
+        try:
+            self.load(*load_sources())
+        finally:
+            with self._lock:
+                self.rebuilding -= 1
+                if self.missed and not self.rebuilding:
+                    #the sources may have been read before that write: rebuild again on the next read
+                    self.stale = True
+                    self.missed = False
+
+    def snapshot(self):
+        #plain dicts without zero groups, used by the consistency check
+        with self._lock:
+            return {
+                name: {key: value for key, value in getattr(self, name).items() if value}
+                for name in ("status_counts", "meal_type_claims", "completed_by_provider",
+                             "receiver_quantity", "receiver_claims", "provider_quantity")
+            }
+
+    #dashboard frames, same columns as the Listing Details queries they replace
+
+    def claim_status_frame(self):
+        with self._lock:
+            counts = {status: n for status, n in self.status_counts.items() if n}
+        total = sum(counts.values())
+        return pd.DataFrame(
+            [(status, round(n * 100 / total, 2)) for status, n in counts.items()],
+            columns=['status', 'Percentage'])
+
+    def meal_type_claims_frame(self):
+        with self._lock:
+            rows = [(meal, n) for meal, n in self.meal_type_claims.most_common() if n]
+        return pd.DataFrame(rows, columns=['Meal_Type', 'ClaimCount'])
+
+    def top_provider_frame(self):
+        with self._lock:
+            rows = [(provider, n, 'Completed') for provider, n in self.completed_by_provider.most_common(1) if n]
+        return pd.DataFrame(rows, columns=['ProviderName', 'FoodClaimCount', 'Status'])
+
+    def avg_quantity_per_receiver_frame(self):
+        with self._lock:
+            rows = [(name, self.receiver_quantity[name] / n) for name, n in self.receiver_claims.items() if n]
+        return pd.DataFrame(rows, columns=['ReceiverName', 'AvgQuantity'])
+
+    def quantity_per_provider_frame(self):
+        with self._lock:
+            rows = [(name, quantity) for name, quantity in self.provider_quantity.items()]
+        return pd.DataFrame(rows, columns=['ProviderName', 'TotalQuantity'])
+
+
+#ground truth for the consistency check: (aggregate, query returning group key + value)
+CHECK_QUERIES = [
+    ("status_counts", "select Status, count(*) as Value from claims group by Status"),
+    ("meal_type_claims", "select f.Meal_Type, count(*) as Value from claims c join food_listings f on c.Food_ID = f.Food_ID group by f.Meal_Type"),
+    ("completed_by_provider", "select p.name, count(*) as Value from claims c join food_listings f on c.Food_ID = f.Food_ID join providers p on p.Provider_ID = f.Provider_ID where c.Status = 'Completed' group by p.name"),
+    ("receiver_quantity", "select r.name, sum(f.Quantity) as Value from claims c join food_listings f on c.Food_ID = f.Food_ID join receivers r on r.Receiver_ID = c.Receiver_ID group by r.name"),
+    ("receiver_claims", "select r.name, count(*) as Value from claims c join food_listings f on c.Food_ID = f.Food_ID join receivers r on r.Receiver_ID = c.Receiver_ID group by r.name"),
+    ("provider_quantity", "select p.name, sum(f.Quantity) as Value from providers p join food_listings f on p.Provider_ID = f.Provider_ID group by p.name"),
+]
+
+
+def load_sources():
+    return run_query(LISTINGS_QUERY, ttl=0, primary=True), run_query(RECEIVERS_QUERY, ttl=0, primary=True), run_query(CLAIM_GROUPS_QUERY, ttl=0, primary=True)
+
+
+def build_store():
+    store = AggregateStore()
+    store.rebuild()
+    return store
+
+
+@st.cache_resource
+def _shared_store():
+    return AggregateStore()
+
+
+def get_aggregates():
+    #process-wide store; rebuilt on first use, after it saw an unknown key, and every REBUILD_INTERVAL
+    store = _shared_store()
+    if store.stale or time.time() - store.built_at > REBUILD_INTERVAL:
+        store.rebuild()
+    return store
+
+
+def apply_claim(food_id, receiver_id, status, delta=1):
+    #writers report committed claims here, after the commit; never triggers a rebuild
+    _shared_store().apply_claim(food_id, receiver_id, status, delta)
+
+
+def replace_claim(old, new):
+    _shared_store().replace_claim(old, new)
+
+
+def mark_stale():
+    #called after listings change outside the claim writers; the next read rebuilds
+    _shared_store().stale = True
+
+
+def check_consistency(store):
+    #recompute every aggregate with a full SQL group-by; returns {aggregate: {group: (store, database)}} for groups that differ
+    live = store.snapshot()
+    drift = {}
+    for name, query in CHECK_QUERIES:
+        df = run_query(query, ttl=0, primary=True)
+        truth = {key: value for key, value in zip(df.iloc[:, 0], df['Value']) if value}
+        keys = set(live[name]) | set(truth)
+        diff = {key: (live[name].get(key, 0), truth.get(key, 0))
+                for key in keys if live[name].get(key, 0) != truth.get(key, 0)}
+        if diff:
+            drift[name] = diff
+    return drift
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "check"
+    if command == "rebuild":
+        store = build_store()
+        for name, groups in store.snapshot().items():
+            print(f"{name}: {len(groups)} groups")
+    elif command == "check":
+        drift = check_consistency(build_store())
+        print("consistent" if not drift else drift)
+        return 1 if drift else 0
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,145 @@
+"""Dashboard metrics, declared once and fetched in batched round trips.
+
+The Home KPIs come back from a single query and the "Listing Details" reports
+from one multi-statement batch plus the materialized aggregate store.
+Identical statements are only sent once.
+"""
+import threading
+import time
+from dataclasses import dataclass, fields, replace
+
+import pandas as pd
+import streamlit as st
+
+from fwms.aggregates import AggregateStore, get_aggregates
+from fwms.cache import normalize_sql
+from fwms.changefeed import completed_delta, get_hub
+from fwms.db import get_cache, run_batch, run_query
+
+KPI_QUERY = """
+select
+    (select sum(quantity) from food_listings where Expiry_Date >= cast(getdate() as date)) as TotalQuantity,
+    (select count(claim_ID) from Claims where status='Completed') as ClaimCount,
+    (select count(provider_ID) from providers) as ProviderCount,
+    (select count(receiver_ID) from receivers) as ReceiverCount
+"""
+
+#tables behind the KPIs that never reach the claims change feed
+KPI_TABLES = ("food_listings", "providers", "receivers")
+
+#name -> query, in the order the reports are shown on the Listing Details tab
+LISTING_METRICS = {
+    "providers_per_city": "select City, count(name) as ProviderCount from providers group by city order by ProviderCount desc",
+    "receivers_per_city": "select City, count(name) as ReceiverCount from receivers group by city order by ReceiverCount desc",
+    "provider_types": "select Provider_type, count(provider_type) as FoodProvidedCount from food_listings group by Provider_Type order by FoodProvidedCount desc",
+    "top_receivers": "select City, count(name) as ReceiverCount from receivers group by city order by ReceiverCount desc",
+    "total_quantity": "select sum(quantity) as TotalQuantity from food_listings",
+    "top_locations": "select top 10 Location, count(location) as Count from food_listings group by location order by Count desc",
+    "food_types": "select Food_type, count(food_type) as Count from food_listings group by Food_Type order by Count desc",
+    "food_item_claims": "select Food_Name, count(Food_Name) as Claims from food_listings group by Food_Name order by Claims desc",
+}
+
+#claim/listing join aggregates are maintained incrementally in fwms.aggregates instead of queried
+MATERIALIZED_METRICS = {
+    "top_provider": AggregateStore.top_provider_frame,
+    "claim_status": AggregateStore.claim_status_frame,
+    "avg_quantity_per_receiver": AggregateStore.avg_quantity_per_receiver_frame,
+    "meal_type_claims": AggregateStore.meal_type_claims_frame,
+    "quantity_per_provider": AggregateStore.quantity_per_provider_frame,
+}
+
+
+@dataclass(frozen=True)
+class Kpis:
+    total_quantity: int
+    completed_claims: int
+    providers: int
+    receivers: int
+
+
+@dataclass(frozen=True)
+class ListingDetails:
+    providers_per_city: pd.DataFrame
+    receivers_per_city: pd.DataFrame
+    provider_types: pd.DataFrame
+    top_receivers: pd.DataFrame
+    total_quantity: pd.DataFrame
+    top_locations: pd.DataFrame
+    food_types: pd.DataFrame
+    food_item_claims: pd.DataFrame
+    top_provider: pd.DataFrame
+    claim_status: pd.DataFrame
+    avg_quantity_per_receiver: pd.DataFrame
+    meal_type_claims: pd.DataFrame
+    quantity_per_provider: pd.DataFrame
+
+
+def dedupe(metrics):
+    #returns the distinct statements plus, for each metric name, the index of its statement
+    statements, positions, slot_of = [], {}, {}
+    for name, query in metrics.items():
+        key = normalize_sql(query)
+        if key not in slot_of:
+            slot_of[key] = len(statements)
+            statements.append(query)
+        positions[name] = slot_of[key]
+    return statements, positions
+
+
+def load_kpis(ttl=None):
+    row = run_query(KPI_QUERY, ttl=ttl).iloc[0]
+    return Kpis(
+        total_quantity=int(row["TotalQuantity"]) if pd.notna(row["TotalQuantity"]) else 0,
+        completed_claims=int(row["ClaimCount"]),
+        providers=int(row["ProviderCount"]),
+        receivers=int(row["ReceiverCount"]),
+    )
+
+
+class LiveKpis:
+    """The Home KPIs, kept current from the claims change feed once per process for every session.
+
+    Listings, providers and receivers are not in the feed, and neither are claim
+    deletes from other instances, so the KPIs are also reloaded after max_age
+    seconds and whenever one of KPI_TABLES is invalidated.
+    """
+
+    def __init__(self, max_age):
+        self._lock = threading.Lock()
+        self._feed = get_hub().subscribe()
+        self.max_age = max_age
+        self.kpis = None
+        self.loaded_at = 0.0
+        self._generation = None
+
+    def _outdated(self):
+        return (time.monotonic() - self.loaded_at > self.max_age
+                or get_cache().generation(*KPI_TABLES) != self._generation)
+
+    def current(self):
+        with self._lock:
+            changes, lagged = self._feed.drain()
+            delta = completed_delta(changes) if self.kpis is not None else None
+            if self.kpis is None or lagged or (changes and delta is None) or self._outdated():
+                #first use, too old, or a change this process cannot patch (inserts, writes from other instances, other tables)
+                self._generation = get_cache().generation(*KPI_TABLES)
+                self.kpis = load_kpis()
+                self.loaded_at = time.monotonic()
+            elif delta:
+                self.kpis = replace(self.kpis, completed_claims=self.kpis.completed_claims + delta)
+            return self.kpis
+
+
+@st.cache_resource
+def live_kpis():
+    #as old as a cached query may get
+    return LiveKpis(get_cache().default_ttl)
+
+
+def load_listing_details():
+    statements, positions = dedupe(LISTING_METRICS)
+    frames = run_batch(statements)
+    store = get_aggregates()
+    values = {name: frames[position] for name, position in positions.items()}
+    values.update({name: frame(store) for name, frame in MATERIALIZED_METRICS.items()})
+    return ListingDetails(**{f.name: values[f.name] for f in fields(ListingDetails)})
@@ -0,0 +1,99 @@
+"""Storage backends: SQL Server through pyodbc, or an embedded SQLite file.
+
+The app's SQL is written in T-SQL. Each backend translates it to its own
+dialect, so the same queries run against a local SQLite database for
+offline runs and load tests. Select a backend with
+
+    FWMS_BACKEND=sqlite FWMS_SQLITE_PATH=local.db streamlit run food.py
+
+or with a [storage] backend = "sqlite" entry in .streamlit/secrets.toml.
+Read replicas are listed under the backend's own section, each entry
+overriding the connection settings:
+
+    [[sqlserver.replicas]]
+    server = "replica1"
+"""
+import functools
+import os
+import re
+import sqlite3
+
+_TOP = re.compile(r"^(\s*select\s+(?:distinct\s+)?)top\s*\(?\s*(\d+)\s*\)?\s+", re.IGNORECASE)
+_TODAY = re.compile(r"\bcast\s*\(\s*getdate\(\)\s+as\s+date\s*\)", re.IGNORECASE)
+_GETDATE = re.compile(r"\bgetdate\(\)", re.IGNORECASE)
+_DECIMAL = re.compile(r"\bdecimal\s*\(\s*\d+\s*,\s*\d+\s*\)", re.IGNORECASE)
+_NOCOUNT = re.compile(r"^\s*set\s+nocount\s+on\s*;\s*", re.IGNORECASE)
+_CAST_PARAM = re.compile(r"\bcast\s*\(\s*\?\s+as\s+datetime\s*\)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def tsql_to_sqlite(sql):
+    sql = _NOCOUNT.sub("", sql)
+    top = _TOP.match(sql)
+    if top:
+        #"select top 10 ..." -> "select ... limit 10"; only the outermost select uses top in this app
+        sql = top.group(1) + sql[top.end():].rstrip().rstrip(";") + f" limit {top.group(2)}"
+    sql = _TODAY.sub("date('now', 'localtime')", sql)
+    #SQLite keeps timestamps as text, and casting one to "datetime" would turn it into a number
+    sql = _CAST_PARAM.sub("?", sql)
+    sql = _GETDATE.sub("datetime('now', 'localtime')", sql)
+    return _DECIMAL.sub("real", sql)
+
+
+class SqlServerBackend:
+    name = "sqlserver"
+    supports_batch = True
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    @property
+    def driver(self):
+        import pyodbc
+        return pyodbc
+
+    def connect(self, overrides=None):
+        #overrides: a replica's entry from settings["replicas"], e.g. {"server": "replica1"}
+        settings = {**self.settings, **(overrides or {})}
+        return self.driver.connect(
+            f'DRIVER={settings["driver"]};'
+            f'SERVER={settings["server"]};'
+            f'DATABASE={settings["database"]};'
+        )
+
+    def translate(self, sql):
+        return sql
+
+
+class SqliteBackend:
+    name = "sqlite"
+    supports_batch = False
+    driver = sqlite3
+
+    def __init__(self, settings):
+        #a file path: every pooled connection has to see the same database, so ":memory:" won't do
+        self.settings = settings
+        self.path = os.environ.get("FWMS_SQLITE_PATH") or settings.get("path", "fwms_local.db")
+
+    def connect(self, overrides=None):
+        path = (overrides or {}).get("path", self.path)
+        conn = sqlite3.connect(path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.execute("pragma journal_mode = wal")
+        conn.execute("pragma foreign_keys = on")
+        return conn
+
+    def translate(self, sql):
+        return tsql_to_sqlite(sql)
+
+
+BACKENDS = {
+    SqlServerBackend.name: SqlServerBackend,
+    SqliteBackend.name: SqliteBackend,
+}
+
+
+def make_backend(name, settings):
+    try:
+        return BACKENDS[name](settings)
+    except KeyError:
+        raise ValueError(f"Unknown storage backend {name!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,201 @@
+"""Bulk claim import and streaming export.
+
+    python -m fwms.bulk import claims.csv [--chunksize 5000]
+    python -m fwms.bulk export claims_out.csv [--chunksize 5000]
+
+Imports stream CSV or Parquet in chunks, validate Food_ID/Receiver_ID/Status
+against cached key sets and insert each chunk with executemany in its own
+transaction. Rows that fail validation are reported, not inserted.
+"""
+import argparse
+import csv
+import datetime
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from fwms import aggregates
+from fwms.db import get_connection, invalidate, run_query
+from fwms.metrics import instrumented
+
+CHUNKSIZE = 5000
+KEYS_TTL = 300
+REQUIRED_COLUMNS = ['Food_ID', 'Receiver_ID', 'Status']
+INSERT_SQL = "INSERT INTO claims (Food_ID, Receiver_ID, Status, timestamp) VALUES (?, ?, ?, ?)"
+
+
+@dataclass
+class Reject:
+    row: int
+    reason: str
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    rejects: list = field(default_factory=list)
+
+    @property
+    def rejected(self):
+        return len(self.rejects)
+
+
+def load_key_sets():
+    #valid keys, cached like any other query so repeated imports don't rescan the tables
+    food_ids = set(run_query("select Food_ID from food_listings", ttl=KEYS_TTL)['Food_ID'].tolist())
+    receiver_ids = set(run_query("select Receiver_ID from receivers", ttl=KEYS_TTL)['Receiver_ID'].tolist())
+    statuses = set(run_query("select distinct Status from Claims", ttl=KEYS_TTL)['Status'].tolist())
+    return food_ids, receiver_ids, statuses
+
+
+def iter_chunks(source, chunksize=CHUNKSIZE, fmt=None):
+    #source: path or file-like (e.g. a Streamlit upload); fmt defaults to the file extension
+    name = getattr(source, "name", source)
+    fmt = fmt or ("parquet" if str(name).lower().endswith(".parquet") else "csv")
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunksize)
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet import needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _normalize_columns(df):
+    by_lower = {column.lower(): column for column in df.columns}
+    missing = [column for column in REQUIRED_COLUMNS if column.lower() not in by_lower]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    renamed = {by_lower[column.lower()]: column for column in REQUIRED_COLUMNS}
+    if "timestamp" in by_lower:
+        renamed[by_lower["timestamp"]] = "Timestamp"
+    return df.rename(columns=renamed)
+
+
+def validate_chunk(df, first_row, keys):
+    #returns ({row: (Food_ID, Receiver_ID, Status, timestamp)}, [Reject]); rows are numbered from first_row
+    food_ids, receiver_ids, statuses = keys
+    df = _normalize_columns(df)
+    now = datetime.datetime.now()
+    rows, rejects = {}, []
+
+    food = pd.to_numeric(df['Food_ID'], errors='coerce')
+    receiver = pd.to_numeric(df['Receiver_ID'], errors='coerce')
+    #a blank Timestamp means "now"; one that is given but doesn't parse rejects the row
+    raw_stamps = df['Timestamp'] if 'Timestamp' in df else None
+    stamps = pd.to_datetime(raw_stamps, errors='coerce', format='mixed') if raw_stamps is not None else None
+
+    for i, (food_id, receiver_id, status) in enumerate(zip(food, receiver, df['Status'])):
+        row = first_row + i
+        if pd.isna(food_id) or food_id != int(food_id):
+            rejects.append(Reject(row, "Food_ID is not an integer"))
+        elif pd.isna(receiver_id) or receiver_id != int(receiver_id):
+            rejects.append(Reject(row, "Receiver_ID is not an integer"))
+        elif int(food_id) not in food_ids:
+            rejects.append(Reject(row, f"Unknown Food_ID {int(food_id)}"))
+        elif int(receiver_id) not in receiver_ids:
+            rejects.append(Reject(row, f"Unknown Receiver_ID {int(receiver_id)}"))
+        elif status not in statuses:
+            rejects.append(Reject(row, f"Unknown Status {status!r}"))
+        elif stamps is not None and pd.isna(stamps.iloc[i]) and not pd.isna(raw_stamps.iloc[i]):
+            rejects.append(Reject(row, f"Timestamp {raw_stamps.iloc[i]!r} is not a date"))
+        else:
+            stamp = stamps.iloc[i] if stamps is not None and not pd.isna(stamps.iloc[i]) else now
+            rows[row] = (int(food_id), int(receiver_id), status, pd.Timestamp(stamp).to_pydatetime())
+    return rows, rejects
+
+
+@instrumented("insert_rows")
+def insert_rows(rows):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if hasattr(cursor, "fast_executemany"):
+            cursor.fast_executemany = True
+        try:
+            cursor.executemany(INSERT_SQL, rows)
+            conn.commit()
+        except Exception:
+            #inside a page's session() the connection is shared and never rolled back on exit, so undo the chunk here
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+
+def import_claims(source, chunksize=CHUNKSIZE, fmt=None):
+    report = ImportReport()
+    keys = load_key_sets()
+    next_row = 1
+    try:
+        for chunk in iter_chunks(source, chunksize, fmt):
+            rows, rejects = validate_chunk(chunk, next_row, keys)
+            report.rejects.extend(rejects)
+            if rows:
+                try:
+                    insert_rows(list(rows.values()))
+                except Exception as e:
+                    #the chunk's transaction was rolled back, so none of its rows went in
+                    report.rejects.extend(Reject(row, f"Chunk failed: {e}") for row in rows)
+                else:
+                    report.inserted += len(rows)
+                    for (food_id, receiver_id, status), n in Counter(values[:3] for values in rows.values()).items():
+                        aggregates.apply_claim(food_id, receiver_id, status, n)
+            next_row += len(chunk)
+    finally:
+        if report.inserted:
+            invalidate("claims")
+    return report
+
+
+@instrumented("export_claims")
+def export_claims(out, chunksize=CHUNKSIZE):
+    #streams claims to CSV with fetchmany, never holding more than one chunk; out is a path or text file
+    close = isinstance(out, str)
+    handle = open(out, "w", newline="") if close else out
+    written = 0
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM claims ORDER BY Claim_ID")
+            writer = csv.writer(handle)
+            writer.writerow([column[0] for column in cursor.description])
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+            cursor.close()
+    finally:
+        if close:
+            handle.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fwms.bulk", description="Bulk claim import/export")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--format", choices=["csv", "parquet"])
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        report = import_claims(args.path, args.chunksize, args.format)
+        print(f"inserted {report.inserted}, rejected {report.rejected}")
+        for reject in report.rejects:
+            print(f"row {reject.row}: {reject.reason}", file=sys.stderr)
+        return 1 if report.rejects else 0
+
+    print(f"exported {export_claims(args.path, args.chunksize)} claims")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
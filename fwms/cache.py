@@ -0,0 +1,162 @@
+"""In-process cache of query results keyed by normalized SQL and parameters.
+
+Entries expire after a per-query TTL, the cache is kept under a memory budget
+with LRU eviction, and writes invalidate every entry that reads the written
+table.
+"""
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+_TABLE_REF = re.compile(r"\b(?:from|join|into|update)\s+([\w.\[\]]+)", re.IGNORECASE)
+
+
+def normalize_sql(query):
+    #collapse whitespace and case outside string literals so equivalent statements share a key
+    parts = query.strip().rstrip(";").split("'")
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE.sub(" ", parts[i]).lower()
+    return "'".join(parts).strip()
+
+
+def referenced_tables(query):
+    tables = set()
+    for name in _TABLE_REF.findall(query):
+        name = name.replace("[", "").replace("]", "").split(".")[-1].lower()
+        if name:
+            tables.add(name)
+    return tables
+
+
+def result_size(result):
+    if isinstance(result, (tuple, list)):
+        return sum(result_size(item) for item in result)
+    try:
+        return int(result.memory_usage(index=True, deep=True).sum())
+    except AttributeError:
+        return sys.getsizeof(result)
+
+
+class QueryCache:
+
+    def __init__(self, default_ttl=60.0, max_bytes=64 * 1024 * 1024):
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()   # key -> (result, expires_at, size, tables)
+        self._by_table = {}             # table -> {key}
+        self._bytes = 0
+        self._generations = {}          # table -> number of invalidations
+        self._epoch = 0                 # number of clears
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query, params=None):
+        return normalize_sql(query), tuple(params) if params is not None else None
+
+    def _drop(self, key):
+        result, expires_at, size, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result, tables, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        size = result_size(result)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (result, time.monotonic() + ttl, size, frozenset(tables))
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, query, params, load, ttl=None):
+        #ttl=0 always loads and caches nothing
+        if ttl is not None and ttl <= 0:
+            return load()
+        key = self.make_key(query, params)
+        result = self.get(key)
+        if result is None:
+            result = load()
+            self.put(key, result, referenced_tables(query), ttl)
+        return result
+
+    def get_or_load_batch(self, queries, load, ttl=None):
+        #a batch is cached as one entry that depends on every table any of its statements reads
+        if ttl is not None and ttl <= 0:
+            return tuple(load())
+        key = ("batch",) + tuple(normalize_sql(query) for query in queries)
+        result = self.get(key)
+        if result is None:
+            result = tuple(load())
+            tables = set()
+            for query in queries:
+                tables |= referenced_tables(query)
+            self.put(key, result, tables, ttl)
+        return result
+
+    def generation(self, *tables):
+        #changes whenever one of the tables is invalidated or the cache is cleared; lets holders of derived state notice
+        with self._lock:
+            return (self._epoch,) + tuple(self._generations.get(table.lower(), 0) for table in tables)
+
+    def invalidate(self, *tables):
+        #drop only the entries that read one of the given tables
+        with self._lock:
+            dropped = 0
+            for table in tables:
+                self._generations[table.lower()] = self._generations.get(table.lower(), 0) + 1
+                for key in list(self._by_table.get(table.lower(), ())):
+                    self._drop(key)
+                    dropped += 1
+            self.invalidations += dropped
+            return dropped
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
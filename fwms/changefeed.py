@@ -0,0 +1,249 @@
+"""Claims change feed: a polled change source, an in-process pub/sub hub, and
+helpers that patch session-side frames from the deltas.
+
+A background poller reads claims whose Timestamp moved past a watermark and
+publishes them to every subscribed session. Writes made by this process are
+published straight away by the claims service, including deletes, which the
+timestamp watermark cannot see. The source remembers those, so the poller does
+not publish them a second time with an unknown previous status. SQL Server change tracking would also catch
+deletes made elsewhere, but it needs database-level configuration. Here a
+subscriber that falls too far behind is told it lagged and reloads.
+
+LocalChangeSource stands in for the database when testing offline:
+
+    hub = ChangeHub()
+    source = LocalChangeSource()
+    Poller(source, hub, interval=0.1).start()
+    feed = hub.subscribe()
+    source.emit(ClaimChange("upsert", 1, 10, 20, "Pending"))
+"""
+import datetime
+import logging
+import os
+import threading
+import weakref
+from collections import deque
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from fwms.db import load_settings, run_query
+
+logger = logging.getLogger("fwms.changefeed")
+
+CLAIM_COLUMNS = ['Claim_ID', 'Food_ID', 'Receiver_ID', 'Status', 'Timestamp']
+POLL_INTERVAL = 2.0
+#how often live views drain their subscription; they only rerun their own fragment
+LIVE_INTERVAL = 2.0
+OVERLAP = datetime.timedelta(seconds=5)
+#SQL Server datetime columns round to 1/300 s, so a stored timestamp can differ slightly from the one we wrote
+ROUNDING = datetime.timedelta(milliseconds=4)
+MAX_PENDING = 10000
+
+
+@dataclass(frozen=True)
+class ClaimChange:
+    kind: str                       # "upsert" or "delete"
+    claim_id: int
+    food_id: int = None
+    receiver_id: int = None
+    status: str = None
+    timestamp: datetime.datetime = None
+    previous_status: str = None     # only known for changes made by this process
+
+
+class Subscription:
+
+    def __init__(self, max_pending=MAX_PENDING):
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self.max_pending = max_pending
+        self.lagged = False
+
+    def push(self, changes):
+        with self._lock:
+            if len(self._pending) + len(changes) > self.max_pending:
+                #too far behind to patch; the owner reloads instead
+                self._pending.clear()
+                self.lagged = True
+            else:
+                self._pending.extend(changes)
+
+    def drain(self):
+        #returns (changes, lagged) and resets both
+        with self._lock:
+            changes, lagged = list(self._pending), self.lagged
+            self._pending.clear()
+            self.lagged = False
+        return changes, lagged
+
+
+class ChangeHub:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        #sessions keep their Subscription in st.session_state; when the session goes away so does the subscription
+        self._subscriptions = weakref.WeakSet()
+        self.source = None
+
+    def subscribe(self, max_pending=MAX_PENDING):
+        subscription = Subscription(max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def publish(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.push(changes)
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+
+class TimestampChangeSource:
+    """Polls claims by Timestamp watermark, re-reading a small overlap for clock skew."""
+
+    def __init__(self, overlap=OVERLAP):
+        self.overlap = overlap
+        self.watermark = None
+        self._lock = threading.Lock()
+        self._seen = {}     # Claim_ID -> Timestamp already published within the overlap window
+
+    def _is_seen(self, claim_id, stamp):
+        seen = self._seen.get(claim_id)
+        return seen is not None and abs(seen - stamp) <= ROUNDING
+
+    def remember(self, changes):
+        #changes this process published itself; the poller skips their rows instead of echoing them
+        with self._lock:
+            for change in changes:
+                if change.kind == "upsert" and change.timestamp is not None:
+                    self._seen[change.claim_id] = change.timestamp
+
+    def poll(self):
+        #always from the primary: rows a lagging replica has not seen yet would slip under the watermark
+        if self.watermark is None:
+            #start from "now": sessions load their initial state themselves
+            latest = run_query("select max(Timestamp) as Latest from claims", ttl=0, primary=True)['Latest'].iloc[0]
+            #SQLite returns an aggregate as text: it has no declared type to convert from
+            self.watermark = pd.Timestamp(latest).to_pydatetime() if pd.notna(latest) else datetime.datetime(1900, 1, 1)
+            #the rows inside the overlap window are part of that initial state too
+            self._read()
+            return []
+        return self._read()
+
+    def _read(self):
+        df = run_query(f"select {', '.join(CLAIM_COLUMNS)} from claims where Timestamp > ? order by Timestamp",
+                       (self.watermark - self.overlap,), ttl=0, primary=True)
+        changes = []
+        with self._lock:
+            for row in df.itertuples(index=False):
+                stamp = row.Timestamp.to_pydatetime()
+                self.watermark = max(self.watermark, stamp)
+                if self._is_seen(row.Claim_ID, stamp):
+                    continue
+                self._seen[row.Claim_ID] = stamp
+                changes.append(ClaimChange("upsert", int(row.Claim_ID), int(row.Food_ID), int(row.Receiver_ID), row.Status, stamp))
+
+            horizon = self.watermark - self.overlap
+            self._seen = {claim_id: stamp for claim_id, stamp in self._seen.items() if stamp > horizon}
+        return changes
+
+
+class LocalChangeSource:
+    """In-memory stand-in for the database; tests emit the changes they want delivered."""
+
+    def __init__(self):
+        self._pending = deque()
+
+    def emit(self, *changes):
+        self._pending.extend(changes)
+
+    def remember(self, changes):
+        pass
+
+    def poll(self):
+        changes = []
+        while self._pending:
+            changes.append(self._pending.popleft())
+        return changes
+
+
+class Poller(threading.Thread):
+
+    def __init__(self, source, hub, interval=POLL_INTERVAL):
+        super().__init__(name="fwms-changefeed", daemon=True)
+        self.source = source
+        self.hub = hub
+        self.interval = interval
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                self.hub.publish(self.source.poll())
+            except Exception:
+                logger.exception("Polling the claims change source failed")
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+@st.cache_resource
+def get_hub():
+    #one hub and one poller per process; FWMS_CHANGE_SOURCE=local swaps the database for LocalChangeSource
+    settings = load_settings("changefeed")
+    hub = ChangeHub()
+    if os.environ.get("FWMS_CHANGE_SOURCE", settings.get("source", "timestamp")) == "local":
+        hub.source = LocalChangeSource()
+    else:
+        hub.source = TimestampChangeSource()
+    Poller(hub.source, hub, float(settings.get("interval", POLL_INTERVAL))).start()
+    return hub
+
+
+def subscribe_session(key):
+    #one subscription per session and view; st.session_state keeps it alive for the hub's WeakSet
+    if key not in st.session_state:
+        st.session_state[key] = get_hub().subscribe()
+    return st.session_state[key]
+
+
+def publish_local(*changes):
+    hub = get_hub()
+    hub.source.remember(changes)
+    hub.publish(list(changes))
+
+
+def apply_changes(df, changes):
+    #patch a claims frame (CLAIM_COLUMNS) with a list of ClaimChange; the last change per claim wins
+    latest = {}
+    for change in changes:
+        latest[change.claim_id] = change
+    if not latest:
+        return df
+    upserts = [(c.claim_id, c.food_id, c.receiver_id, c.status, c.timestamp) for c in latest.values() if c.kind == "upsert"]
+    patched = df[~df['Claim_ID'].isin(list(latest))]
+    if upserts:
+        patched = pd.concat([patched, pd.DataFrame(upserts, columns=CLAIM_COLUMNS)], ignore_index=True)
+    return patched.sort_values('Claim_ID', ignore_index=True)
+
+
+def completed_delta(changes):
+    #change in the number of Completed claims, or None if some change's previous status is unknown
+    delta = 0
+    for change in changes:
+        if change.kind == "upsert" and change.previous_status is None:
+            return None
+        before = change.previous_status == 'Completed'
+        after = change.kind == "upsert" and change.status == 'Completed'
+        delta += after - before
+    return delta
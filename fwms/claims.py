@@ -0,0 +1,129 @@
+"""Claims service: single-row lookups, optimistic updates and batch status transitions.
+
+Every write goes through here so cached claims queries are invalidated, the
+aggregate store receives its deltas and the change feed hears about updates
+and deletes (inserts reach it through the poller, once they have a Claim_ID).
+The claims timestamp doubles as the row version: update_claim/delete_claim
+only touch the row if it still carries the timestamp the operator loaded.
+"""
+import datetime
+from dataclasses import dataclass
+
+import pandas as pd
+
+from fwms import aggregates
+from fwms.changefeed import ClaimChange, publish_local
+from fwms.db import get_connection, invalidate, run_query, translate
+from fwms.metrics import instrumented
+from fwms.snapshot import forget_claims
+
+#SQL Server accepts at most 2100 parameters per statement
+MAX_IDS_PER_STATEMENT = 1000
+
+#pyodbc binds a datetime as datetime2, which never equals the rounded value of a datetime column; compare as datetime
+VERSION_MATCH = "Claim_ID = ? AND Timestamp = CAST(? AS datetime)"
+
+
+class ConcurrentUpdateError(Exception):
+    """The claim was changed or deleted by someone else since it was loaded."""
+
+
+@dataclass(frozen=True)
+class Claim:
+    claim_id: int
+    food_id: int
+    receiver_id: int
+    status: str
+    timestamp: datetime.datetime
+
+
+@instrumented("get_claim")
+def get_claim(claim_id):
+    #primary-key lookup; returns None when the claim does not exist
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Claim_ID, Food_ID, Receiver_ID, Status, Timestamp FROM claims WHERE Claim_ID = ?", (claim_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    return Claim(*row) if row is not None else None
+
+
+def claim_id_range():
+    df = run_query("select min(Claim_ID) as First, max(Claim_ID) as Last from claims")
+    first, last = df['First'].iloc[0], df['Last'].iloc[0]
+    return (int(first), int(last)) if pd.notna(first) else (None, None)
+
+
+@instrumented("insert_claim")
+def insert_claim(food_id, receiver_id, status):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(translate("INSERT INTO claims ( food_ID, receiver_ID, status, timestamp) VALUES ( ?, ?, ?, getdate())"), (food_id, receiver_id, status))
+        conn.commit()
+    invalidate("claims")
+    aggregates.replace_claim(None, (food_id, receiver_id, status))
+
+
+@instrumented("update_claim")
+def update_claim(claim_id, food_id, receiver_id, status, expected_timestamp):
+    #raises ConcurrentUpdateError instead of overwriting a row that changed since expected_timestamp
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(translate(f"SELECT Food_ID, Receiver_ID, Status FROM claims WHERE {VERSION_MATCH}"), (claim_id, expected_timestamp))
+        old_claim = cursor.fetchone()
+        current_timestamp = datetime.datetime.now()
+        cursor.execute(
+            translate(f"UPDATE claims SET Food_ID = ?, Receiver_ID = ?, Status = ?, Timestamp = ? WHERE {VERSION_MATCH}"),
+            (food_id, receiver_id, status, current_timestamp, claim_id, expected_timestamp))
+        if cursor.rowcount != 1 or old_claim is None:
+            conn.rollback()
+            raise ConcurrentUpdateError(f"Claim {claim_id} was changed by someone else, reload it and try again")
+        conn.commit()
+    invalidate("claims")
+    aggregates.replace_claim(tuple(old_claim), (food_id, receiver_id, status))
+    publish_local(ClaimChange("upsert", claim_id, food_id, receiver_id, status, current_timestamp, previous_status=old_claim[2]))
+
+
+@instrumented("delete_claim")
+def delete_claim(claim_id, expected_timestamp):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(translate(f"SELECT Food_ID, Receiver_ID, Status FROM claims WHERE {VERSION_MATCH}"), (claim_id, expected_timestamp))
+        old_claim = cursor.fetchone()
+        cursor.execute(translate(f"DELETE FROM claims WHERE {VERSION_MATCH}"), (claim_id, expected_timestamp))
+        if cursor.rowcount != 1 or old_claim is None:
+            conn.rollback()
+            raise ConcurrentUpdateError(f"Claim {claim_id} was changed by someone else, reload it and try again")
+        conn.commit()
+    invalidate("claims")
+    aggregates.replace_claim(tuple(old_claim), None)
+    forget_claims([claim_id])
+    publish_local(ClaimChange("delete", claim_id, *old_claim[:2], previous_status=old_claim[2]))
+
+
+@instrumented("transition_status")
+def transition_status(claim_ids, from_status, to_status):
+    #moves every listed claim currently in from_status to to_status; one UPDATE per 1000 ids, one transaction
+    claim_ids = list(dict.fromkeys(claim_ids))
+    now = datetime.datetime.now()
+    moved, changed_rows = 0, []
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(claim_ids), MAX_IDS_PER_STATEMENT):
+            ids = claim_ids[start:start + MAX_IDS_PER_STATEMENT]
+            placeholders = ", ".join("?" for _ in ids)
+            cursor.execute(f"SELECT Claim_ID, Food_ID, Receiver_ID FROM claims WHERE Status = ? AND Claim_ID IN ({placeholders})", (from_status, *ids))
+            changed_rows.extend(cursor.fetchall())
+            cursor.execute(f"UPDATE claims SET Status = ?, Timestamp = ? WHERE Status = ? AND Claim_ID IN ({placeholders})", (to_status, now, from_status, *ids))
+            moved += cursor.rowcount
+        conn.commit()
+    if moved:
+        invalidate("claims")
+        for _, food_id, receiver_id in changed_rows:
+            aggregates.replace_claim((food_id, receiver_id, from_status), (food_id, receiver_id, to_status))
+        publish_local(*(ClaimChange("upsert", claim_id, food_id, receiver_id, to_status, now, previous_status=from_status)
+                        for claim_id, food_id, receiver_id in changed_rows))
+        if moved != len(changed_rows):
+            #a concurrent writer changed the matched set between the two statements
+            aggregates.mark_stale()
+    return moved
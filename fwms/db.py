@@ -0,0 +1,274 @@
+"""Data access used by food.py: pooled connections and query helpers.
+
+Read-only run_query/run_batch calls go to a read replica when one is
+configured and healthy. A replica is healthy when its lag behind the
+primary is within max_replica_lag seconds. Lag is measured every
+REPLICA_CHECK_INTERVAL from the newest claim Timestamp on the primary and on
+the replica, or with the backend's replica_lag_query. A replica that lacks
+the primary's newest claim has been stale at least since that claim was
+written. Writes
+always use the primary. A session that just wrote also reads from the
+primary, uncached, until any replica would have caught up.
+"""
+import datetime
+import itertools
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from fwms.backends import make_backend
+from fwms.cache import QueryCache, normalize_sql, result_size
+from fwms.metrics import timed_query
+from fwms.pool import ConnectionPool
+
+
+def load_settings(section):
+    #a missing secrets file or section just means defaults
+    try:
+        return dict(st.secrets[section])
+    except Exception:
+        return {}
+
+
+@st.cache_resource
+def get_backend():
+    name = os.environ.get("FWMS_BACKEND") or load_settings("storage").get("backend", "sqlserver")
+    return make_backend(name, load_settings(name))
+
+
+def translate(sql):
+    #T-SQL as written in the app -> the active backend's dialect
+    return get_backend().translate(sql)
+
+
+@st.cache_resource
+def get_pool():
+    #one pool per server process, shared by every browser session
+    backend = get_backend()
+    settings = backend.settings
+    return ConnectionPool(
+        backend.connect,
+        size=int(settings.get("pool_size", 5)),
+        timeout=float(settings.get("pool_timeout", 30)),
+        idle_timeout=float(settings.get("pool_idle_timeout", 300)),
+    )
+
+
+class Replica:
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag = None
+        self.error = None
+
+
+@st.cache_resource
+def get_replicas():
+    #one pool per configured replica, sized like the primary's
+    backend = get_backend()
+    settings = backend.settings
+    replicas = []
+    for i, overrides in enumerate(settings.get("replicas", [])):
+        overrides = dict(overrides)
+        pool = ConnectionPool(
+            lambda overrides=overrides: backend.connect(overrides),
+            size=int(settings.get("pool_size", 5)),
+            timeout=float(settings.get("pool_timeout", 30)),
+            idle_timeout=float(settings.get("pool_idle_timeout", 300)),
+        )
+        replicas.append(Replica(overrides.get("name") or overrides.get("server") or overrides.get("path") or f"replica{i + 1}", pool))
+    return replicas
+
+
+REPLICA_CHECK_INTERVAL = 10
+LAG_WATERMARK_QUERY = "select max(Timestamp) as Latest from claims"
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_check_lock = threading.Lock()
+_last_check = [0.0]
+_round_robin = itertools.count()
+
+
+def max_replica_lag():
+    return float(get_backend().settings.get("max_replica_lag", 5))
+
+
+def _latest(pool):
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(LAG_WATERMARK_QUERY)
+        latest = cursor.fetchone()[0]
+        cursor.close()
+    if isinstance(latest, str):
+        latest = datetime.datetime.fromisoformat(latest)
+    return latest
+
+
+def check_replicas():
+    #measure every replica's lag; a replica that errors or lags too far is skipped until the next check
+    lag_query = get_backend().settings.get("replica_lag_query")
+    primary_latest = None if lag_query else _latest(get_pool())
+    for replica in get_replicas():
+        try:
+            if lag_query:
+                with replica.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(lag_query)
+                    replica.lag = float(cursor.fetchone()[0] or 0)
+                    cursor.close()
+            else:
+                latest = _latest(replica.pool)
+                if primary_latest is None:
+                    replica.lag = 0.0
+                elif latest is None:
+                    replica.lag = float("inf")
+                elif latest < primary_latest:
+                    #missing a write made at primary_latest: stale for at least as long as that write is old
+                    replica.lag = max((primary_latest - latest).total_seconds(),
+                                      (datetime.datetime.now() - primary_latest).total_seconds())
+                else:
+                    replica.lag = 0.0
+            replica.error = None
+            replica.healthy = replica.lag <= max_replica_lag()
+        except Exception as e:
+            replica.healthy, replica.error = False, repr(e)
+
+
+def _session_wrote_recently():
+    #read-your-writes: until every replica could have caught up with this session's last write
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is None:
+            return False
+        last_write = st.session_state.get("fwms_last_write")
+    except Exception:
+        return False
+    return last_write is not None and time.time() - last_write < max_replica_lag() + REPLICA_CHECK_INTERVAL
+
+
+def mark_write():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is not None:
+            st.session_state["fwms_last_write"] = time.time()
+    except Exception:
+        pass
+
+
+def read_pool(query):
+    #the pool a read-only statement should use: a healthy replica, else the primary
+    replicas = get_replicas()
+    if not replicas or not _READ_ONLY.match(query) or _session_wrote_recently():
+        return get_pool()
+    if time.time() - _last_check[0] > REPLICA_CHECK_INTERVAL and _check_lock.acquire(blocking=False):
+        try:
+            check_replicas()
+            _last_check[0] = time.time()
+        finally:
+            _check_lock.release()
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return get_pool()
+    return healthy[next(_round_robin) % len(healthy)].pool
+
+
+def replica_stats():
+    return [{"replica": r.name, "healthy": r.healthy, "lag_s": r.lag, "error": r.error, **r.pool.stats()}
+            for r in get_replicas()]
+
+
+def get_connection():
+    #usage: with get_connection() as conn: ...  (the connection goes back to the pool on exit)
+    return get_pool().connection()
+
+
+def session():
+    return get_pool().session()
+
+
+@st.cache_resource
+def get_cache():
+    settings = get_backend().settings
+    return QueryCache(
+        default_ttl=float(settings.get("cache_ttl", 60)),
+        max_bytes=int(settings.get("cache_max_mb", 64)) * 1024 * 1024,
+    )
+
+
+def _read_sql(query, params=None, timeout=None, primary=False):
+    with (get_pool() if primary else read_pool(query)).connection() as conn:
+        #pyodbc exposes a per-connection query timeout in seconds; other drivers just ignore it
+        previous = getattr(conn, "timeout", None)
+        if timeout and previous is not None:
+            conn.timeout = int(timeout)
+        try:
+            df = pd.read_sql(translate(query), conn, params=params)
+        finally:
+            if timeout and previous is not None:
+                conn.timeout = previous
+    return df
+
+
+def run_query(query, params=None, ttl=None, timeout=None, primary=False):
+    #ttl=0 bypasses the cache, primary=True skips the replicas; cached frames are shared, so hand out a shallow copy
+    if get_replicas() and _session_wrote_recently():
+        #a cached result may have come from a replica that has not seen this session's write
+        ttl = 0
+    with timed_query(normalize_sql(query)) as info:
+        loaded = []
+        df = get_cache().get_or_load(query, params, lambda: loaded.append(_read_sql(query, params, timeout, primary)) or loaded[0], ttl=ttl)
+        info.update(rows=len(df), bytes=result_size(df) if loaded else 0, cache_hit=not loaded)
+    return df.copy(deep=False)
+
+
+def _fetch_frame(cursor):
+    columns = [column[0] for column in cursor.description]
+    return pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+
+
+def _read_batch(queries):
+    pool = read_pool(queries[0]) if all(_READ_ONLY.match(query) for query in queries) else get_pool()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        if not get_backend().supports_batch:
+            #backends without multiple result sets (SQLite) still share one connection
+            frames = []
+            for query in queries:
+                cursor.execute(translate(query))
+                frames.append(_fetch_frame(cursor))
+            return frames
+
+        #one round trip: every statement in a single batch, read back result set by result set
+        cursor.execute("set nocount on;\n" + ";\n".join(query.strip().rstrip(";") for query in queries))
+        frames = [_fetch_frame(cursor)]
+        while cursor.nextset():
+            frames.append(_fetch_frame(cursor))
+        cursor.close()
+    return frames
+
+
+def run_batch(queries, ttl=None):
+    #returns one DataFrame per query, in order
+    label = f"batch of {len(queries)}: " + " | ".join(normalize_sql(query)[:40] for query in queries)
+    if get_replicas() and _session_wrote_recently():
+        ttl = 0
+    with timed_query(label) as info:
+        loaded = []
+        frames = get_cache().get_or_load_batch(queries, lambda: loaded.append(_read_batch(queries)) or loaded[0], ttl=ttl)
+        info.update(rows=sum(len(df) for df in frames), bytes=result_size(frames) if loaded else 0, cache_hit=not loaded)
+    return [df.copy(deep=False) for df in frames]
+
+
+def invalidate(*tables):
+    #call after committing a write so cached reads of those tables are refetched; the session then reads from the primary
+    mark_write()
+    return get_cache().invalidate(*tables)
+
+
+def cache_stats():
+    return get_cache().stats()
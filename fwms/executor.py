@@ -0,0 +1,87 @@
+"""Run independent queries concurrently on a shared worker pool.
+
+Each worker borrows its own pooled connection, so a page is only as slow as
+its slowest query. Results are reported per task instead of failing the
+whole page on the first error.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from fwms.db import run_query
+
+DEFAULT_TIMEOUT = 30.0
+MAX_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class QueryResult:
+    name: str
+    value: object = None
+    error: BaseException = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fwms-query")
+        return _executor
+
+
+def _in_script_context(fn):
+    #worker threads inherit the caller's Streamlit context so st.secrets / st.cache_resource behave as in the page
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    except ImportError:
+        return fn
+    ctx = get_script_run_ctx()
+
+    def run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+    return run
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    return fn(), time.perf_counter() - started
+
+
+def run_parallel(tasks, timeout=DEFAULT_TIMEOUT):
+    #tasks: {name: zero-argument callable} -> {name: QueryResult}
+    executor = get_executor()
+    futures = {name: executor.submit(_timed, _in_script_context(fn)) for name, fn in tasks.items()}
+    deadline = time.monotonic() + timeout
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            value, elapsed = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            results[name] = QueryResult(name, value=value, elapsed=elapsed)
+        except FutureTimeout:
+            future.cancel()
+            results[name] = QueryResult(name, error=TimeoutError(f"'{name}' did not finish within {timeout}s"), elapsed=timeout)
+        except Exception as e:
+            results[name] = QueryResult(name, error=e)
+    return results
+
+
+def run_queries(queries, timeout=DEFAULT_TIMEOUT):
+    #queries: {name: sql or (sql, params)}; the timeout is also passed to the driver
+    tasks = {}
+    for name, query in queries.items():
+        sql, params = query if isinstance(query, tuple) else (query, None)
+        tasks[name] = lambda sql=sql, params=params: run_query(sql, params, timeout=timeout)
+    return run_parallel(tasks, timeout=timeout)
@@ -0,0 +1,41 @@
+"""Background jobs, one of each per server process.
+
+The schedulers live in fwms.lifecycle (archiving expired listings) and
+fwms.reports (report snapshots), which import pandas and the data layer.
+food.py only imports this module. The schedulers are imported and started on
+a helper thread the first time start_background_jobs() runs, so neither the
+first page render nor later reruns wait for those imports.
+"""
+import importlib
+import logging
+import threading
+
+import streamlit as st
+
+logger = logging.getLogger("fwms.jobs")
+
+#module -> function that starts its scheduler (itself cached once per process)
+JOBS = {
+    "fwms.lifecycle": "start_scheduler",
+    "fwms.reports": "start_report_scheduler",
+}
+
+
+def _start_jobs():
+    for module, function in JOBS.items():
+        try:
+            getattr(importlib.import_module(module), function)()
+        except Exception:
+            logger.exception("Starting %s.%s failed", module, function)
+
+
+@st.cache_resource
+def start_background_jobs():
+    #the helper thread keeps the script's context so the schedulers' st.cache_resource behaves as in the page
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+    thread = threading.Thread(target=_start_jobs, name="fwms-jobs", daemon=True)
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        add_script_run_ctx(thread, ctx)
+    thread.start()
+    return thread
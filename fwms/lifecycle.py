@@ -0,0 +1,277 @@
+"""Listing lifecycle: archive expired food listings into monthly history partitions.
+
+A background scheduler wakes up every `interval` seconds. Each run moves
+listings that expired more than `grace_days` ago out of food_listings, in
+batches of `batch_size` rows. The batches are found through an index on
+Expiry_Date, and each one is a single transaction. Archived rows go to
+food_listings_history_YYYYMM, one table per expiry month, and the
+food_listings_history view unions them all. Dropping a month of history is
+a DROP TABLE.
+
+A claimed listing moves together with its claims: they go to
+claims_history_YYYYMM, filed under the listing's expiry month, behind a
+claims_history view. The dashboards join claims to listings, so once
+archived the claims no longer count in the claim statistics. Both tables
+stay small either way.
+
+Settings come from a [lifecycle] section in .streamlit/secrets.toml
+(enabled, interval, batch_size, grace_days, max_batches).
+
+    python -m fwms.lifecycle run [--batch-size 1000] [--dry-run]
+    python -m fwms.lifecycle ensure     # create the expiry index
+"""
+import argparse
+import datetime
+import logging
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+
+import streamlit as st
+
+from fwms.aggregates import mark_stale
+from fwms.db import get_backend, get_connection, invalidate, load_settings, translate
+from fwms.metrics import instrumented
+from fwms.snapshot import forget_claims
+
+logger = logging.getLogger("fwms.lifecycle")
+
+COLUMNS = ['Food_ID', 'Food_Name', 'Quantity', 'Expiry_Date', 'Provider_ID', 'Provider_Type', 'Location', 'Food_Type', 'Meal_Type']
+CLAIM_COLUMNS = ['Claim_ID', 'Food_ID', 'Receiver_ID', 'Status', 'Timestamp']
+HISTORY_PREFIX = "food_listings_history"
+CLAIMS_HISTORY_PREFIX = "claims_history"
+
+BATCH_SIZE = 1000
+INTERVAL = 60 * 60
+GRACE_DAYS = 1
+MAX_BATCHES = 100
+
+#top N ... order by Expiry_Date walks ix_food_listings_expiry from the oldest date up
+EXPIRED_QUERY = f"""select top {{n}} {', '.join('f.' + c for c in COLUMNS)}
+from food_listings f
+where f.Expiry_Date < ?
+order by f.Expiry_Date"""
+
+PARTITION_COLUMNS = """(
+    Food_ID int primary key,
+    Food_Name varchar(100),
+    Quantity int,
+    Expiry_Date date,
+    Provider_ID int,
+    Provider_Type varchar(50),
+    Location varchar(100),
+    Food_Type varchar(50),
+    Meal_Type varchar(50),
+    Archived_At datetime
+)"""
+
+CLAIMS_PARTITION_COLUMNS = """(
+    Claim_ID int primary key,
+    Food_ID int,
+    Receiver_ID int,
+    Status varchar(50),
+    Timestamp datetime,
+    Archived_At datetime
+)"""
+
+#history prefix -> (columns moved, partition DDL columns)
+HISTORIES = {
+    HISTORY_PREFIX: (COLUMNS, PARTITION_COLUMNS),
+    CLAIMS_HISTORY_PREFIX: (CLAIM_COLUMNS, CLAIMS_PARTITION_COLUMNS),
+}
+
+#the DDL differs enough between the backends that each gets its own statements
+DDL = {
+    "sqlserver": {
+        "expiry_index": "if not exists (select 1 from sys.indexes where name = 'ix_food_listings_expiry') "
+                        "create index ix_food_listings_expiry on food_listings (Expiry_Date)",
+        "create_partition": "if object_id('{name}', 'U') is null create table {name} {columns}",
+        "list_partitions": "select name from sys.tables where name like '{prefix}%'",
+        "drop_view": "if object_id('{prefix}', 'V') is not null drop view {prefix}",
+    },
+    "sqlite": {
+        "expiry_index": "create index if not exists ix_food_listings_expiry on food_listings (Expiry_Date)",
+        "create_partition": "create table if not exists {name} {columns}",
+        "list_partitions": "select name from sqlite_master where type = 'table' and name like '{prefix}%'",
+        "drop_view": "drop view if exists {prefix}",
+    },
+}
+
+
+def _ddl(statement):
+    return DDL[get_backend().name][statement]
+
+
+def partition_name(expiry_date, prefix=HISTORY_PREFIX):
+    return f"{prefix}_{expiry_date:%Y%m}"
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def ensure_expiry_index():
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_ddl("expiry_index"))
+        conn.commit()
+
+
+def _partitions(cursor, prefix=HISTORY_PREFIX):
+    cursor.execute(_ddl("list_partitions").format(prefix=prefix))
+    pattern = re.compile(rf"^{prefix}_(\d{{6}})$")
+    return sorted(row[0] for row in cursor.fetchall() if pattern.match(row[0]))
+
+
+def _rebuild_view(cursor, prefix=HISTORY_PREFIX):
+    partitions = _partitions(cursor, prefix)
+    cursor.execute(_ddl("drop_view").format(prefix=prefix))
+    if partitions:
+        cursor.execute(f"create view {prefix} as " +
+                       " union all ".join(f"select * from {name}" for name in partitions))
+
+
+def _write_history(cursor, prefix, by_month):
+    #by_month: partition month -> rows (Archived_At last); the view is rebuilt when a month is new
+    columns, partition_columns = HISTORIES[prefix]
+    existing = set(_partitions(cursor, prefix))
+    names = set()
+    for month, month_rows in by_month.items():
+        name = partition_name(month, prefix)
+        names.add(name)
+        cursor.execute(_ddl("create_partition").format(name=name, columns=partition_columns))
+        cursor.executemany(f"insert into {name} ({', '.join(columns)}, Archived_At) values ({', '.join('?' * (len(columns) + 1))})",
+                           month_rows)
+    return not existing.issuperset(names)
+
+
+@instrumented("archive_batch")
+def archive_batch(cutoff, batch_size=BATCH_SIZE, dry_run=False):
+    #moves up to batch_size listings that expired before cutoff, with their claims; returns (listings, claim ids) moved
+    archived_at = datetime.datetime.now()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(translate(EXPIRED_QUERY.format(n=batch_size)), (cutoff,))
+        rows = [tuple(row) for row in cursor.fetchall()]
+        if not rows or dry_run:
+            return len(rows), []
+
+        ids = [row[0] for row in rows]
+        placeholders = ", ".join("?" for _ in ids)
+        month_of = {row[0]: _as_date(row[3]).replace(day=1) for row in rows}
+        cursor.execute(f"select {', '.join(CLAIM_COLUMNS)} from claims where Food_ID in ({placeholders})", ids)
+        claim_rows = [tuple(row) for row in cursor.fetchall()]
+
+        listings_by_month, claims_by_month = defaultdict(list), defaultdict(list)
+        for row in rows:
+            listings_by_month[month_of[row[0]]].append(row + (archived_at,))
+        for row in claim_rows:
+            claims_by_month[month_of[row[1]]].append(row + (archived_at,))
+        new_months = _write_history(cursor, HISTORY_PREFIX, listings_by_month)
+        new_claim_months = _write_history(cursor, CLAIMS_HISTORY_PREFIX, claims_by_month) if claim_rows else False
+
+        cursor.execute(f"delete from claims where Food_ID in ({placeholders})", ids)
+        claims_deleted = cursor.rowcount
+        cursor.execute(f"delete from food_listings where Food_ID in ({placeholders}) "
+                       f"and not exists (select 1 from claims c where c.Food_ID = food_listings.Food_ID)", ids)
+        if claims_deleted != len(claim_rows) or cursor.rowcount != len(ids):
+            #a listing was claimed after it was selected: leave the whole batch for the next run
+            conn.rollback()
+            logger.info("Archive batch raced with a new claim, retrying on the next run")
+            return 0, []
+        if new_months:
+            _rebuild_view(cursor, HISTORY_PREFIX)
+        if new_claim_months:
+            _rebuild_view(cursor, CLAIMS_HISTORY_PREFIX)
+        conn.commit()
+    return len(rows), [row[0] for row in claim_rows]
+
+
+def archive_expired(batch_size=BATCH_SIZE, grace_days=GRACE_DAYS, max_batches=MAX_BATCHES, dry_run=False):
+    #one scheduler run: batches until nothing is left or max_batches is reached
+    cutoff = datetime.date.today() - datetime.timedelta(days=grace_days)
+    moved, claim_ids = 0, []
+    for _ in range(max_batches):
+        n, batch_claims = archive_batch(cutoff, batch_size, dry_run)
+        moved += n
+        claim_ids += batch_claims
+        if n < batch_size or dry_run:
+            break
+    if moved and not dry_run:
+        invalidate("food_listings", "claims")
+        #the aggregates and the columnar snapshot still include the archived rows
+        mark_stale()
+        forget_claims(claim_ids)
+        logger.info("Archived %d expired listings and %d of their claims", moved, len(claim_ids))
+    return moved
+
+
+class Scheduler(threading.Thread):
+
+    def __init__(self, interval=INTERVAL, **options):
+        super().__init__(name="fwms-lifecycle", daemon=True)
+        self.interval = interval
+        self.options = options
+        self.last_run = None
+        self.last_moved = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        try:
+            ensure_expiry_index()
+        except Exception:
+            logger.exception("Could not create the expiry index")
+        while not self._halt.is_set():
+            try:
+                self.last_moved = archive_expired(**self.options)
+                self.last_run = datetime.datetime.now()
+            except Exception:
+                logger.exception("Archiving expired listings failed")
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+@st.cache_resource
+def start_scheduler():
+    #one scheduler per server process; returns None when disabled in settings
+    #FWMS_LIFECYCLE=off disables it too, e.g. for benchmarks that must not have rows disappear
+    settings = load_settings("lifecycle")
+    if not settings.get("enabled", True) or os.environ.get("FWMS_LIFECYCLE") == "off":
+        return None
+    scheduler = Scheduler(
+        interval=float(settings.get("interval", INTERVAL)),
+        batch_size=int(settings.get("batch_size", BATCH_SIZE)),
+        grace_days=int(settings.get("grace_days", GRACE_DAYS)),
+        max_batches=int(settings.get("max_batches", MAX_BATCHES)),
+    )
+    scheduler.start()
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fwms.lifecycle", description="Archive expired food listings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    run.add_argument("--grace-days", type=int, default=GRACE_DAYS)
+    run.add_argument("--dry-run", action="store_true", help="count the first batch without moving anything")
+    sub.add_parser("ensure")
+    args = parser.parse_args(argv)
+
+    ensure_expiry_index()
+    if args.command == "run":
+        moved = archive_expired(args.batch_size, args.grace_days, max_batches=sys.maxsize, dry_run=args.dry_run)
+        print(f"{'would archive' if args.dry_run else 'archived'} {moved:,} listings")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Server-side filtering and keyset pagination for the Food Listings tab."""
+from fwms.db import run_query
+
+FILTER_COLUMNS = ['Provider_Type', 'Food_Type', 'Location', 'Food_Name']
+PAGE_SIZE = 50
+OPTIONS_TTL = 300
+
+
+def build_where(filters, skip=None):
+    #filters: {column: [selected values]}; only whitelisted columns reach the SQL text
+    clauses, params = [], []
+    for column in FILTER_COLUMNS:
+        values = filters.get(column) or []
+        if column == skip or not values:
+            continue
+        clauses.append(f"{column} in ({', '.join('?' for _ in values)})")
+        params.extend(values)
+    return clauses, params
+
+
+def _where_sql(clauses):
+    return " where " + " and ".join(clauses) if clauses else ""
+
+
+def filter_options(column, filters, timeout=None):
+    #options narrow with the other selections, like DynamicFilters did in pandas
+    if column not in FILTER_COLUMNS:
+        raise ValueError(f"Unknown filter column: {column}")
+    clauses, params = build_where(filters, skip=column)
+    query = f"select distinct {column} from food_listings{_where_sql(clauses)} order by {column}"
+    df = run_query(query, params or None, ttl=OPTIONS_TTL, timeout=timeout)
+    return df[column].dropna().tolist()
+
+
+def count_listings(filters, timeout=None):
+    clauses, params = build_where(filters)
+    df = run_query(f"select count(*) as Total from food_listings{_where_sql(clauses)}", params or None, timeout=timeout)
+    return int(df['Total'].iloc[0])
+
+
+def fetch_page(filters, after=None, page_size=PAGE_SIZE, timeout=None):
+    #returns (rows, has_next); the next page starts after the last Food_ID of this one
+    clauses, params = build_where(filters)
+    if after is not None:
+        clauses.append("Food_ID > ?")
+        params.append(after)
+    query = f"select top {int(page_size) + 1} * from food_listings{_where_sql(clauses)} order by Food_ID"
+    df = run_query(query, params or None, timeout=timeout)
+    return df.head(page_size), len(df) > page_size
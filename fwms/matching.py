@@ -0,0 +1,283 @@
+"""Nearest-available-food matching for receivers.
+
+Listings are bucketed by city, and cities are placed on a uniform lat/lon grid
+using the coordinates in the cities table (City, Latitude, Longitude). For a
+receiver, the grid is searched ring by ring outwards from the receiver's city.
+Available listings are ranked by
+
+    score = W_DISTANCE * km + W_EXPIRY * days_to_expiry - W_QUANTITY * log(1 + quantity)
+
+where lower is better, so food that is close, expires soon and is plentiful
+comes first. The search stops as soon as no farther ring can beat the current
+top results. Each city's bucket is presorted by the part of the score that
+does not depend on distance.
+
+A listing is available until its expiry date as long as no claim on it is
+Pending or Completed. The index follows claims through the change feed and is
+rebuilt every REBUILD_INTERVAL, which also picks up new listings. If the
+cities table is missing, receivers are only matched with listings in their
+own city.
+
+    python -m fwms.matching suggest 42 --limit 10
+"""
+import argparse
+import datetime
+import heapq
+import logging
+import math
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from fwms.changefeed import get_hub
+from fwms.db import run_query
+
+logger = logging.getLogger("fwms.matching")
+
+LISTINGS_QUERY = """select f.Food_ID, f.Food_Name, f.Quantity, f.Expiry_Date, f.Location, f.Food_Type, f.Meal_Type, p.Name as ProviderName
+from food_listings f left join providers p on p.Provider_ID = f.Provider_ID
+where f.Quantity > 0 and f.Expiry_Date >= ?"""
+ACTIVE_CLAIMS_QUERY = "select Claim_ID, Food_ID from claims where Status in ('Pending', 'Completed')"
+RECEIVERS_QUERY = "select Receiver_ID, Name, City from receivers"
+CITIES_QUERY = "select City, Latitude, Longitude from cities"
+
+ACTIVE_STATUSES = ('Pending', 'Completed')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.19
+CELL_DEGREES = 0.5
+
+#score weights, in "km" per unit: one day closer to expiry is worth 2 km, the quantity term at most ~20 km
+W_DISTANCE = 1.0
+W_EXPIRY = 2.0
+W_QUANTITY = 5.0
+
+REBUILD_INTERVAL = 10 * 60
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    food_id: int
+    food_name: str
+    quantity: int
+    expiry_date: datetime.date
+    location: str
+    provider: str
+    food_type: str
+    meal_type: str
+    distance_km: float      # None when the receiver's city has no coordinates
+    score: float
+
+
+def haversine_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def _cell(coords):
+    return int(math.floor(coords[0] / CELL_DEGREES)), int(math.floor(coords[1] / CELL_DEGREES))
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+class MatchIndex:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built_at = 0.0
+        self.feed = None
+        self.coords = {}                    # City -> (lat, lon)
+        self.grid = defaultdict(list)       # (lat cell, lon cell) -> [City]
+        self.buckets = {}                   # City -> [(local key, row)] sorted by local key
+        self.receivers = {}                 # Receiver_ID -> (Name, City)
+        self.claimed = Counter()            # Food_ID -> active claims
+        self.claim_food = {}                # Claim_ID -> Food_ID, active claims only
+        self.max_quantity = 0
+        self.cell_km = CELL_DEGREES * KM_PER_DEGREE
+
+    @property
+    def built(self):
+        return self.built_at > 0
+
+    def load(self, listings, active_claims, receivers, cities):
+        buckets = defaultdict(list)
+        for row in listings.itertuples(index=False):
+            expiry = _as_date(row.Expiry_Date)
+            row = row._replace(Expiry_Date=expiry)
+            #the distance-free part of the score; ordering by it holds whatever "today" is
+            key = W_EXPIRY * expiry.toordinal() - W_QUANTITY * math.log1p(row.Quantity)
+            buckets[row.Location].append((key, row))
+        for bucket in buckets.values():
+            bucket.sort(key=lambda item: item[0])
+
+        coords = {row.City: (float(row.Latitude), float(row.Longitude))
+                  for row in cities.itertuples(index=False) if pd.notna(row.Latitude) and pd.notna(row.Longitude)}
+        grid = defaultdict(list)
+        for city, point in coords.items():
+            grid[_cell(point)].append(city)
+        #one grid step along a meridian is CELL_DEGREES * KM_PER_DEGREE; along a parallel it shrinks with latitude
+        max_lat = max((abs(lat) for lat, _ in coords.values()), default=0.0)
+        cell_km = CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(min(max_lat + CELL_DEGREES, 89.0)))
+
+        claim_food = dict(zip(active_claims['Claim_ID'].tolist(), active_claims['Food_ID'].tolist()))
+        with self._lock:
+            self.buckets = dict(buckets)
+            self.coords, self.grid, self.cell_km = coords, grid, cell_km
+            self.receivers = {row.Receiver_ID: (row.Name, row.City) for row in receivers.itertuples(index=False)}
+            self.claim_food = claim_food
+            self.claimed = Counter(claim_food.values())
+            self.max_quantity = int(listings['Quantity'].max()) if len(listings) else 0
+            self.built_at = time.time()
+
+    def apply_changes(self, changes):
+        #idempotent: a claim is counted once, under its latest Food_ID, while its status is active
+        with self._lock:
+            for change in changes:
+                food_id = self.claim_food.pop(change.claim_id, None)
+                if food_id is not None:
+                    self.claimed[food_id] -= 1
+                    if self.claimed[food_id] <= 0:
+                        del self.claimed[food_id]
+                if change.kind == "upsert" and change.status in ACTIVE_STATUSES:
+                    self.claim_food[change.claim_id] = change.food_id
+                    self.claimed[change.food_id] += 1
+
+    def _rings(self, origin):
+        #occupied cells grouped by Chebyshev ring around origin's cell: yields (ring, [City]) nearest ring first
+        ci, cj = _cell(origin)
+        rings = defaultdict(list)
+        for (i, j), cities in self.grid.items():
+            rings[max(abs(i - ci), abs(j - cj))].extend(cities)
+        for ring in sorted(rings):
+            yield ring, rings[ring]
+
+    def _take(self, best, city, distance, limit, today):
+        #best is a max-heap of (-score, food_id, suggestion) holding the current top `limit`
+        today_key = W_EXPIRY * today.toordinal()
+        taken = 0
+        for key, row in self.buckets.get(city, ()):
+            if taken >= limit:
+                break
+            if row.Expiry_Date < today or self.claimed.get(row.Food_ID):
+                continue
+            score = W_DISTANCE * (distance or 0.0) + key - today_key
+            if len(best) >= limit and score >= -best[0][0]:
+                break
+            suggestion = Suggestion(int(row.Food_ID), row.Food_Name, int(row.Quantity), row.Expiry_Date, row.Location,
+                                    row.ProviderName, row.Food_Type, row.Meal_Type,
+                                    None if distance is None else round(distance, 1), round(score, 2))
+            entry = (-score, suggestion.food_id, suggestion)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            else:
+                heapq.heapreplace(best, entry)
+            taken += 1
+
+    def suggest(self, receiver_id, limit=10, today=None):
+        today = today or datetime.date.today()
+        with self._lock:
+            receiver = self.receivers.get(receiver_id)
+            if receiver is None:
+                raise KeyError(f"Unknown receiver {receiver_id}")
+            city = receiver[1]
+            best = []
+            origin = self.coords.get(city)
+            if origin is None:
+                self._take(best, city, None, limit, today)
+            else:
+                #no listing scores below this before its distance is added
+                floor = -W_QUANTITY * math.log1p(self.max_quantity)
+                for ring, cities in self._rings(origin):
+                    if len(best) >= limit and W_DISTANCE * max(ring - 1, 0) * self.cell_km + floor >= -best[0][0]:
+                        break
+                    for other in cities:
+                        self._take(best, other, haversine_km(origin, self.coords[other]), limit, today)
+        return [entry[2] for entry in sorted(best, key=lambda entry: (-entry[0], entry[1]))]
+
+
+def build_index():
+    index = MatchIndex()
+    try:
+        cities = run_query(CITIES_QUERY, ttl=0)
+    except Exception:
+        logger.warning("No cities table with coordinates; matching receivers by city name only", exc_info=True)
+        cities = pd.DataFrame(columns=['City', 'Latitude', 'Longitude'])
+    #subscribe before loading so claims changed during the load are replayed on top of it
+    index.feed = get_hub().subscribe()
+    index.load(run_query(LISTINGS_QUERY, (datetime.date.today(),), ttl=0),
+               run_query(ACTIVE_CLAIMS_QUERY, ttl=0),
+               run_query(RECEIVERS_QUERY, ttl=0),
+               cities)
+    return index
+
+
+@st.cache_resource
+def _shared_index():
+    return {"index": None}
+
+
+_build_lock = threading.Lock()
+
+
+def get_index():
+    #one index per process; rebuilt every REBUILD_INTERVAL or when its change feed lagged
+    holder = _shared_index()
+    index = holder["index"]
+    rebuild = index is None or time.time() - index.built_at > REBUILD_INTERVAL
+    if not rebuild:
+        changes, rebuild = index.feed.drain()
+        index.apply_changes(changes)
+    if rebuild:
+        with _build_lock:
+            #another session may have rebuilt it while this one waited
+            if holder["index"] is index:
+                holder["index"] = build_index()
+            index = holder["index"]
+    return index
+
+
+def suggest_food(receiver_id, limit=10):
+    #API: the best `limit` available listings for a receiver, as Suggestion rows
+    return get_index().suggest(receiver_id, limit)
+
+
+def suggestions_frame(suggestions):
+    return pd.DataFrame([{
+        "Food ID": s.food_id, "Food": s.food_name, "Quantity": s.quantity, "Expires": s.expiry_date,
+        "Location": s.location, "Provider": s.provider, "Food Type": s.food_type, "Meal Type": s.meal_type,
+        "Distance (km)": s.distance_km, "Score": s.score,
+    } for s in suggestions])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fwms.matching", description="Suggest available food for a receiver")
+    sub = parser.add_subparsers(dest="command", required=True)
+    suggest = sub.add_parser("suggest")
+    suggest.add_argument("receiver_id", type=int)
+    suggest.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index = build_index()
+    built = time.perf_counter()
+    suggestions = index.suggest(args.receiver_id, args.limit)
+    answered = time.perf_counter()
+    print(suggestions_frame(suggestions).to_string(index=False))
+    print(f"index built in {built - started:.2f}s, answered in {(answered - built) * 1000:.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Process-wide query and page-render metrics.
+
+run_query/run_batch and the claim writers report latency, rows, bytes, cache
+hits and exceptions per normalized statement; page renders report their
+latency per page. Every event is also logged as one JSON line on the
+"fwms.queries" logger (slow queries at WARNING, failures at ERROR).
+"""
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("fwms.queries")
+
+SLOW_QUERY_SECONDS = 1.0
+BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+MAX_SAMPLES = 2048
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)   # last bucket is "slower than the largest bound"
+        self.samples = deque(maxlen=MAX_SAMPLES)   # recent latencies in seconds, for percentiles
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+        self.samples.append(seconds)
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class QueryStats:
+
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.rows = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = {}   # label -> QueryStats
+        self.pages = {}     # page name -> Histogram
+
+    def record_query(self, label, seconds, rows=0, nbytes=0, cache_hit=False, error=None):
+        with self._lock:
+            stats = self.queries.get(label)
+            if stats is None:
+                stats = self.queries[label] = QueryStats(label)
+            stats.calls += 1
+            stats.rows += rows
+            stats.bytes += nbytes
+            stats.cache_hits += bool(cache_hit)
+            stats.errors += error is not None
+            if not cache_hit:
+                #cache hits would drag the database latency percentiles towards zero
+                stats.latency.observe(seconds)
+
+        event = {"query": label, "ms": round(seconds * 1000, 2), "rows": rows, "bytes": nbytes, "cache_hit": cache_hit}
+        if error is not None:
+            event["error"] = repr(error)
+            logger.error(json.dumps(event))
+        elif seconds >= SLOW_QUERY_SECONDS and not cache_hit:
+            logger.warning(json.dumps(event))
+        else:
+            logger.debug(json.dumps(event))
+
+    def record_page(self, name, seconds, error=None):
+        with self._lock:
+            self.pages.setdefault(name, Histogram()).observe(seconds)
+        logger.info(json.dumps({"page": name, "ms": round(seconds * 1000, 2), "error": repr(error) if error else None}))
+
+    def top_queries(self, n=10, by="p95"):
+        #rows for the admin page, slowest first
+        with self._lock:
+            rows = [{
+                "query": stats.label,
+                "calls": stats.calls,
+                "cache_hits": stats.cache_hits,
+                "errors": stats.errors,
+                "rows": stats.rows,
+                "bytes": stats.bytes,
+                "p50_ms": round(stats.latency.percentile(50) * 1000, 2),
+                "p95_ms": round(stats.latency.percentile(95) * 1000, 2),
+                "p99_ms": round(stats.latency.percentile(99) * 1000, 2),
+                "max_ms": round(stats.latency.max * 1000, 2),
+            } for stats in self.queries.values()]
+        return sorted(rows, key=lambda row: row[f"{by}_ms"], reverse=True)[:n]
+
+    def page_percentiles(self):
+        with self._lock:
+            return [{
+                "page": name,
+                "renders": len(hist.samples),
+                "p50_ms": round(hist.percentile(50) * 1000, 2),
+                "p95_ms": round(hist.percentile(95) * 1000, 2),
+                "p99_ms": round(hist.percentile(99) * 1000, 2),
+                "max_ms": round(hist.max * 1000, 2),
+            } for name, hist in self.pages.items()]
+
+    def histogram(self, label):
+        #[(upper bound in ms or None for the overflow bucket, count)]
+        with self._lock:
+            stats = self.queries.get(label)
+            counts = list(stats.latency.counts) if stats else [0] * (len(BUCKETS_MS) + 1)
+        return list(zip(BUCKETS_MS + [None], counts))
+
+    def totals(self):
+        #running totals over every query label, for before/after deltas
+        with self._lock:
+            return {
+                "calls": sum(stats.calls for stats in self.queries.values()),
+                "cache_hits": sum(stats.cache_hits for stats in self.queries.values()),
+                "errors": sum(stats.errors for stats in self.queries.values()),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+            self.pages.clear()
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed_query(label):
+    #the caller fills in rows / bytes / cache_hit on the yielded dict
+    info = {"rows": 0, "bytes": 0, "cache_hit": False}
+    started = time.perf_counter()
+    try:
+        yield info
+    except Exception as e:
+        REGISTRY.record_query(label, time.perf_counter() - started, error=e)
+        raise
+    REGISTRY.record_query(label, time.perf_counter() - started, info["rows"], info["bytes"], info["cache_hit"])
+
+
+def instrumented(label):
+    #decorator for writers such as insert_claim: latency and exceptions, no rows
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_query(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def page_render(name):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        REGISTRY.record_page(name, time.perf_counter() - started, error=e)
+        raise
+    REGISTRY.record_page(name, time.perf_counter() - started)
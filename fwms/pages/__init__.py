@@ -0,0 +1,39 @@
+"""App pages, imported the first time they are opened."""
+import importlib
+import logging
+import os
+
+import streamlit as st
+
+from fwms.metrics import page_render
+
+logger = logging.getLogger("fwms.pages")
+
+PAGES = {
+    "Home": "fwms.pages.home",
+    "Food Waste Management": "fwms.pages.management",
+    "Contact": "fwms.pages.contact",
+    "Admin": "fwms.pages.admin",
+}
+
+
+def admin_enabled():
+    #the Admin page shows raw SQL and resets everyone's metrics: only with FWMS_ADMIN=1 or admin = true under [storage]
+    flag = os.environ.get("FWMS_ADMIN")
+    if flag is None:
+        try:
+            flag = st.secrets["storage"].get("admin", False)
+        except Exception:
+            flag = False
+    return str(flag).lower() in ("1", "true", "yes", "on")
+
+
+def render_page(name):
+    with page_render(name):
+        importlib.import_module(PAGES[name]).render()
+
+
+def report_error(message, error):
+    #log the traceback, show the operator the message and the error text
+    logger.error(message, exc_info=error)
+    st.error(f"{message}: {error}")
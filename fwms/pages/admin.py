@@ -0,0 +1,62 @@
+"""Admin page: slowest queries, page render percentiles, cache, pool, replica and archiver state."""
+import pandas as pd
+import streamlit as st
+
+from fwms.db import cache_stats, get_pool, replica_stats
+from fwms.lifecycle import start_scheduler
+from fwms.metrics import REGISTRY
+from fwms.pages import admin_enabled
+
+
+def render():
+    if not admin_enabled():
+        st.error("The Admin page is disabled. Set FWMS_ADMIN=1 or admin = true under [storage] to enable it.")
+        return
+
+    st.subheader("Page renders")
+    pages = REGISTRY.page_percentiles()
+    if pages:
+        st.dataframe(pd.DataFrame(pages).sort_values("p95_ms", ascending=False), hide_index=True)
+    else:
+        st.info("No page renders recorded yet.")
+
+    st.subheader("Slowest queries")
+    col1, col2 = st.columns([1, 1])
+    top_n = col1.number_input("Top N", min_value=1, max_value=100, value=10)
+    order = col2.selectbox("Order by", ["p95", "p99", "p50", "max"])
+    queries = REGISTRY.top_queries(int(top_n), by=order)
+    if queries:
+        df_queries = pd.DataFrame(queries)
+        st.dataframe(df_queries, hide_index=True)
+
+        selected_query = st.selectbox("Latency histogram for", df_queries["query"].tolist())
+        histogram = pd.DataFrame(REGISTRY.histogram(selected_query), columns=["le_ms", "count"])
+        histogram["le_ms"] = histogram["le_ms"].map(lambda bound: f"<= {bound} ms" if bound else "slower")
+        st.bar_chart(histogram.set_index("le_ms"))
+    else:
+        st.info("No queries recorded yet.")
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.subheader("Query cache")
+        st.json(cache_stats())
+    with col2:
+        st.subheader("Connection pool")
+        st.json(get_pool().stats())
+
+    replicas = replica_stats()
+    if replicas:
+        st.subheader("Read replicas")
+        st.dataframe(pd.DataFrame(replicas), hide_index=True)
+
+    st.subheader("Expired listings archiver")
+    scheduler = start_scheduler()
+    if scheduler is None:
+        st.info("Disabled in settings.")
+    else:
+        st.json({"last_run": str(scheduler.last_run), "archived_last_run": scheduler.last_moved,
+                 "interval_s": scheduler.interval, **scheduler.options})
+
+    if st.button("Reset metrics"):
+        REGISTRY.reset()
+        st.rerun()
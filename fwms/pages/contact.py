@@ -0,0 +1,36 @@
+"""Contact page: provider contacts and the receivers list."""
+import streamlit as st
+from streamlit_option_menu import option_menu
+
+from fwms.metrics import page_render
+from fwms.pages import report_error
+from fwms.pages.grid import paged_table
+from fwms.tables import PROVIDERS, RECEIVERS
+
+
+def render_providers():
+    st.subheader("Contact information of food providers")
+    paged_table(PROVIDERS, "providers", "providers.csv")
+
+
+def render_receivers():
+    st.subheader("List of Receivers")
+    paged_table(RECEIVERS, "receivers", "receivers.csv")
+
+
+TABS = {
+    "Providers Contact": ('shop', render_providers),
+    "Receivers List": ('people', render_receivers),
+}
+
+
+def render():
+    try:
+
+        tab = option_menu(None, list(TABS), icons=[icon for icon, _ in TABS.values()],
+                          orientation="horizontal", key="contact_tab")
+        with page_render(f"Contact / {tab}"):
+            TABS[tab][1]()
+
+    except Exception as e:
+            report_error("An unexpected error occurred", e)
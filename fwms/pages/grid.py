@@ -0,0 +1,45 @@
+"""Paginated, column-projected grid shared by the Contact and Read Claims tables."""
+import os
+import tempfile
+
+import streamlit as st
+
+from fwms.tables import PAGE_SIZES, count_rows, fetch_page, write_csv
+
+
+def grid_controls(view, key):
+    #column choice and page size; either change goes back to the first page
+    col1, col2 = st.columns([4, 1])
+    names = col1.multiselect("Columns", list(view.columns), default=list(view.columns), key=f"{key}_columns")
+    page_size = col2.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    settings = (tuple(names), page_size)
+    if st.session_state.get(f"{key}_settings") != settings:
+        st.session_state[f"{key}_settings"] = settings
+        st.session_state[f"{key}_pages"] = [None]
+    return names, page_size, st.session_state[f"{key}_pages"]
+
+
+def pager(pages, has_next, last, key):
+    prev_col, next_col = st.columns(2)
+    prev_col.button("Previous", disabled=len(pages) == 1, on_click=pages.pop, key=f"{key}_prev")
+    next_col.button("Next", disabled=not has_next, on_click=pages.append, args=(last,), key=f"{key}_next")
+
+
+def download(view, names, key, file_name):
+    if st.button("Prepare CSV download", key=f"{key}_prepare"):
+        #streamed to disk chunk by chunk, never held in memory as one frame
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as export_file:
+            export_path = export_file.name
+        count = write_csv(view, names, export_path)
+        with open(export_path, "rb") as export_file:
+            st.download_button(f"Download {count:,} rows", export_file, file_name=file_name, mime="text/csv", key=f"{key}_download")
+        os.remove(export_path)
+
+
+def paged_table(view, key, file_name):
+    names, page_size, pages = grid_controls(view, key)
+    df, has_next, last = fetch_page(view, names, pages[-1], page_size)
+    st.caption(f"{count_rows(view):,} rows - page {len(pages)}")
+    st.dataframe(df, hide_index=True)
+    pager(pages, has_next, last, key)
+    download(view, names, key, file_name)
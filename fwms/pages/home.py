@@ -0,0 +1,104 @@
+"""Home page: KPI cards over a background image."""
+import streamlit as st
+
+from fwms.analytics import live_kpis
+from fwms.changefeed import LIVE_INTERVAL
+from fwms.pages import report_error
+
+
+@st.fragment(run_every=LIVE_INTERVAL)
+def kpi_cards():
+    #reruns on its own every LIVE_INTERVAL; the KPIs are patched from the claims change feed once per process, not per session
+    kpis = live_kpis().current()
+
+    cols = st.columns(4)
+
+    with cols[0]:
+        st.markdown(f"""
+            <div class="card">
+                <div class="card-title">Total Food Quantity</div>
+                <div class="card-value">{kpis.total_quantity:,}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+    with cols[1]:
+        st.markdown(f"""
+            <div class="card">
+                <div class="card-title">No. of Successful Claims</div>
+                <div class="card-value">{kpis.completed_claims:,}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+    with cols[2]:
+        st.markdown(f"""
+            <div class="card">
+                <div class="card-title">Total No. of Providers</div>
+                <div class="card-value">{kpis.providers:,}</div>
+            </div>
+        """, unsafe_allow_html=True)   
+
+    with cols[3]:
+        st.markdown(f"""
+            <div class="card">
+                <div class="card-title">Total No. of Receivers</div>
+                <div class="card-value">{kpis.receivers:,}</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+
+def render():
+    try:
+#     #background image
+        st.markdown("""
+        <style>
+        .stApp {
+            background: linear-gradient(
+                rgba(0, 0, 0, 0.4), 
+                rgba(0, 0, 0, 0.4)
+            ), 
+            url("https://info.ehl.edu/hubfs/Blog-EHL-Insights/Blog-Header-EHL-Insights/AdobeStock_264542845.jpeg");
+
+            background-size: cover;
+            background-position: center;
+            background-attachment: fixed;
+            background-repeat: no-repeat;
+        }
+        </style>
+    """, unsafe_allow_html=True)
+
+        #card
+        st.markdown("""
+        <style>
+        @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;700&display=swap');
+
+        .card {
+            background-color: rgba(255, 255, 255, 0.1);  /* semi-transparent white */
+            padding: 20px;
+            border: 1px solid rgba(255, 255, 255, 0.3);
+            border-radius: 15px;
+            backdrop-filter: blur(10px);  /* adds a frosted-glass effect */
+            -webkit-backdrop-filter: blur(10px); /* for Safari */
+            box-shadow: 0 4px 30px rgba(0, 0, 0, 0.1);
+            color: white;
+            text-align: center;
+            margin-top: 20px;
+        }
+        .card-title {
+            font-size: 18px;
+            font-weight: 400;
+            color: #13dfd5ff;
+            margin-bottom: 0.5rem;
+        }
+        .card-value {
+            font-size: 32px;
+            font-weight: 700;
+            color: #13dfd5ff;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+        
+        kpi_cards()
+
+    except Exception as e:        
+        report_error("An unexpected error occurred", e)
@@ -0,0 +1,425 @@
+"""Food Waste Management page.
+
+Each tab is its own function and only the selected tab runs, so a rerun
+computes one tab's data instead of every tab's.
+"""
+import os
+import re
+import tempfile
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+from streamlit_option_menu import option_menu
+
+from fwms.analytics import load_listing_details
+from fwms.bulk import export_claims, import_claims
+from fwms.changefeed import CLAIM_COLUMNS, LIVE_INTERVAL, apply_changes, subscribe_session
+from fwms.claims import ConcurrentUpdateError, claim_id_range, delete_claim, get_claim, insert_claim, transition_status, update_claim
+from fwms.db import get_backend, session
+from fwms.executor import DEFAULT_TIMEOUT, run_parallel
+from fwms.listings import FILTER_COLUMNS, count_listings, fetch_page, filter_options
+from fwms.matching import get_index, suggestions_frame
+from fwms.metrics import page_render
+from fwms.reference import get_reference
+from fwms.pages import report_error
+from fwms.pages.grid import download, grid_controls, pager
+from fwms.reports import CHART_REPORTS, latest_report
+from fwms.snapshot import get_snapshot
+from fwms.tables import CLAIMS, count_rows, fetch_page as fetch_table_page
+
+
+def render_listings():
+    #the option lists, the count and the page don't depend on each other, so they load concurrently
+    listing_filters = {c: st.session_state.get(f"filter_{c}", []) for c in FILTER_COLUMNS}
+    if st.session_state.get("listing_filters") != listing_filters:
+        #back to the first page whenever the filters change
+        st.session_state.listing_filters = listing_filters
+        st.session_state.listing_pages = [None]
+    pages = st.session_state.listing_pages
+
+    #the timeout also goes to the driver, so a query the page gave up on doesn't keep running on its worker
+    tasks = {column: partial(filter_options, column, listing_filters, timeout=DEFAULT_TIMEOUT) for column in FILTER_COLUMNS}
+    tasks["listing_count"] = partial(count_listings, listing_filters, timeout=DEFAULT_TIMEOUT)
+    tasks["listing_page"] = partial(fetch_page, listing_filters, pages[-1], timeout=DEFAULT_TIMEOUT)
+    results = run_parallel(tasks, timeout=DEFAULT_TIMEOUT)
+
+    #filter data
+    try:
+        col1, col2 = st.columns([1.75, 6])  # Adjust ratio as needed
+
+        with col1:
+
+            #Options come from the database and narrow with the other selections
+            st.write(":primary[Filter Options]")
+            for column in FILTER_COLUMNS:
+                options = results[column].value if results[column].ok else []
+                if not results[column].ok:
+                    st.warning(f"Could not load {column} options: {results[column].error}")
+                options = options + [v for v in listing_filters[column] if v not in options]
+                st.multiselect(column, options, key=f"filter_{column}")
+
+        with col2:
+                       
+            #Show results, one page at a time
+            st.subheader("Food Listings")
+            if results["listing_count"].ok:
+                st.caption(f"{results['listing_count'].value:,} listings - page {len(pages)}")
+
+            if results["listing_page"].ok:
+                df_page, has_next = results["listing_page"].value
+                next_after = df_page['Food_ID'].iloc[-1].item() if has_next else None
+                st.dataframe(df_page, hide_index=True)
+
+                prev_col, next_col = st.columns(2)
+                prev_col.button("Previous", disabled=len(pages) == 1, on_click=pages.pop)
+                next_col.button("Next", disabled=not has_next, on_click=pages.append, args=(next_after,))
+            else:
+                st.error(f"Could not load food listings: {results['listing_page'].error}")
+    
+    except Exception as e:        
+        report_error("An unexpected error occurred", e)
+
+
+@st.fragment(run_every=LIVE_INTERVAL)
+def live_claims():
+    #one page of claims in session state; subscribed before it loads, so nothing published in between is missed
+    feed = subscribe_session("claims_feed")
+    changes, lagged = feed.drain()
+    names, page_size, pages = grid_controls(CLAIMS, "claims")
+    #deletes made by other app instances leave no timestamp behind; Reload picks them up
+    reload = st.button("Reload", key="claims_reload")
+
+    state = (tuple(names), page_size, pages[-1])
+    page = st.session_state.get("claims_page")
+    if page is None or page["state"] != state or lagged or reload:
+        df, has_next, last = fetch_table_page(CLAIMS, names, pages[-1], page_size, ttl=0)
+        page = st.session_state["claims_page"] = {"state": state, "df": df, "has_next": has_next, "last": last}
+    elif changes:
+        #only claims that belong on this page: inside its key range, or anywhere past it on the last page
+        first = pages[-1] if pages[-1] is not None else 0
+        #an empty page has no last key: every later claim belongs on it
+        relevant = [c for c in changes if c.claim_id > first
+                    and (not page["has_next"] or page["last"] is None or c.claim_id <= page["last"])]
+        if relevant and set(CLAIM_COLUMNS) <= set(page["df"].columns):
+            patched = apply_changes(page["df"], relevant)
+            page["has_next"] = page["has_next"] or len(patched) > page_size
+            page["df"] = patched.head(page_size)
+            page["last"] = int(page["df"]['Claim_ID'].iloc[-1]) if len(page["df"]) else page["last"]
+        elif relevant:
+            #a projection without every claim column cannot be patched in place
+            page["df"], page["has_next"], page["last"] = fetch_table_page(CLAIMS, names, pages[-1], page_size, ttl=0)
+
+    st.caption(f"{count_rows(CLAIMS):,} claims - page {len(pages)}")
+    st.dataframe(page["df"], hide_index=True)
+    pager(pages, page["has_next"], page["last"], "claims")
+    download(CLAIMS, names, "claims", "claims.csv")
+
+
+def lookup_select(label, kind, key, current=None):
+    #type an id prefix or part of a name; only the matches reach the selectbox, never the whole table
+    lookup = get_reference().lookup(kind)
+    search = st.text_input(f"{label}: search by ID or name", key=f"{key}_search")
+    options = lookup.search(search)
+    if current is not None and current not in options:
+        options = [current] + options
+    return st.selectbox(label, options, format_func=lookup.label, key=key)
+
+
+def render_claims():
+    #DB-API exceptions of whichever driver the active backend uses (pyodbc or sqlite3)
+    driver = get_backend().driver
+
+    with session():
+    #CRUD
+        #menu = st.sidebar.selectbox("Menu", ["Create", "Read", "Update", "Delete"])
+        menu_Claim = st.selectbox("Menu", ["Create Claim", "Read Claims", "Update Claim", "Delete Claim", "Batch Status Update", "Bulk Import Claims", "Export Claims"])
+
+        try:
+            if menu_Claim == "Create Claim":
+                    st.subheader("Add New Claim")
+                    #claim_ID = st.text_input("Claim ID")
+                    selected_FoodID = lookup_select("Select Food ID", "food", key="create_food")
+                    #food_ID = st.text_input("Food ID")
+                    selected_ReceiverID = lookup_select("Select Receiver ID", "receiver", key="create_receiver")
+                    #receiver_ID = st.text_input("Receiver ID")#, min_value=0, max_value=120
+                    selected_Status = st.selectbox("Select Claim Status", get_reference().claim_statuses())
+                    #status = st.text_input("Claim Status")
+                    if st.button("Add Claim"):
+                        #the selectboxes are empty when the search matches nothing
+                        if selected_FoodID is None or selected_ReceiverID is None:
+                            st.warning("Select a Food ID and a Receiver ID first.")
+                        else:
+                            insert_claim( selected_FoodID, selected_ReceiverID, selected_Status)
+                            st.success("Claim added!")
+        
+            elif menu_Claim == "Read Claims":
+                    st.subheader("Food Claims List")
+                    live_claims()
+
+            elif menu_Claim == "Update Claim":
+                    st.subheader("Update Claims")
+                    first_id, last_id = claim_id_range()
+                    selected_id = st.number_input("Claim ID to update", min_value=first_id, max_value=last_id, step=1)
+                    selected_claim = get_claim(int(selected_id)) if first_id is not None else None
+                    if selected_claim is None:
+                        st.warning("No claim found with this ID.")
+                    else:
+                        #the update only applies if the claim still has the version the operator loaded
+                        version_key = f"claim_version_{selected_claim.claim_id}"
+                        expected_timestamp = st.session_state.setdefault(version_key, selected_claim.timestamp)
+
+                        claim = {'Selected Claim ID': [selected_claim.claim_id],
+                                'Food ID': [selected_claim.food_id],
+                                'Receiver ID': [selected_claim.receiver_id],
+                                'Status': [selected_claim.status]
+                                }
+                        df_CurrentClaim = pd.DataFrame(claim)
+                        st.dataframe(df_CurrentClaim, hide_index=True)
+
+                        selected_FoodID = lookup_select("New Food ID", "food", key="update_food", current=selected_claim.food_id)
+                        selected_ReceiverID = lookup_select("New Receiver ID", "receiver", key="update_receiver", current=selected_claim.receiver_id)
+                        claim_status = get_reference().claim_statuses()
+                        selected_Status = st.selectbox("New Claim Status", claim_status,
+                                                       index=claim_status.index(selected_claim.status) if selected_claim.status in claim_status else 0)
+                        
+                        update_clicked = st.button("Update")
+                        if update_clicked and (selected_FoodID is None or selected_ReceiverID is None):
+                            st.warning("Select a Food ID and a Receiver ID first.")
+                        elif update_clicked:
+                            try:
+                                update_claim(selected_claim.claim_id, selected_FoodID, selected_ReceiverID, selected_Status, expected_timestamp)
+                                st.success("Claim updated!")
+                            except ConcurrentUpdateError as e:
+                                st.error(str(e))
+                            del st.session_state[version_key]
+                        elif selected_claim.timestamp != expected_timestamp:
+                            st.session_state[version_key] = selected_claim.timestamp
+                            st.warning("This claim was changed by someone else, showing the latest version.")
+                
+
+            elif menu_Claim == "Delete Claim":
+                    st.subheader("Delete Claim")
+                    first_id, last_id = claim_id_range()
+                    selected_id = st.number_input("Claim ID to delete", min_value=first_id, max_value=last_id, step=1)
+                    selected_claim = get_claim(int(selected_id)) if first_id is not None else None
+                    if selected_claim is None:
+                        st.warning("No claim found with this ID.")
+                    else:
+                        version_key = f"claim_version_{selected_claim.claim_id}"
+                        expected_timestamp = st.session_state.setdefault(version_key, selected_claim.timestamp)
+
+                        claim = {'Selected Claim ID': [selected_claim.claim_id],
+                                'Food ID': [selected_claim.food_id],
+                                'Receiver ID': [selected_claim.receiver_id],
+                                'Status': [selected_claim.status]
+                                }
+                        df_CurrentClaim = pd.DataFrame(claim)
+                        st.dataframe(df_CurrentClaim, hide_index=True)
+
+                        if st.button("Delete"):
+                            try:
+                                delete_claim(selected_claim.claim_id, expected_timestamp)
+                                st.warning("Claim deleted!")
+                            except ConcurrentUpdateError as e:
+                                st.error(str(e))
+                            del st.session_state[version_key]
+                        elif selected_claim.timestamp != expected_timestamp:
+                            st.session_state[version_key] = selected_claim.timestamp
+                            st.warning("This claim was changed by someone else, showing the latest version.")
+
+            elif menu_Claim == "Batch Status Update":
+                    st.subheader("Batch Status Update")
+                    claim_status = get_reference().claim_statuses()
+                    from_status = st.selectbox("Current Claim Status", claim_status)
+                    to_status = st.selectbox("New Claim Status", claim_status)
+                    claim_ids_text = st.text_area("Claim IDs (separated by commas or new lines)")
+                    if st.button("Apply"):
+                        claim_ids = [int(x) for x in re.split(r"[,\s]+", claim_ids_text) if x.isdigit()]
+                        moved = transition_status(claim_ids, from_status, to_status)
+                        st.success(f"{moved:,} of {len(claim_ids):,} claims moved from {from_status} to {to_status}!")
+
+            elif menu_Claim == "Bulk Import Claims":
+                    st.subheader("Bulk Import Claims")
+                    st.caption("CSV or Parquet with Food_ID, Receiver_ID, Status and an optional Timestamp column")
+                    uploaded = st.file_uploader("Claims file", type=["csv", "parquet"])
+                    if uploaded is not None and st.button("Import"):
+                        report = import_claims(uploaded)
+                        st.success(f"{report.inserted:,} claims added, {report.rejected:,} rejected")
+                        if report.rejects:
+                            st.dataframe(pd.DataFrame([vars(r) for r in report.rejects]), hide_index=True)
+
+            elif menu_Claim == "Export Claims":
+                    st.subheader("Export Claims")
+                    if st.button("Prepare export"):
+                        #streamed from the database straight to disk, chunk by chunk
+                        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as export_file:
+                            export_path = export_file.name
+                        count = export_claims(export_path)
+                        with open(export_path, "rb") as export_file:
+                            st.download_button(f"Download {count:,} claims", export_file, file_name="claims.csv", mime="text/csv")
+                        os.remove(export_path)
+
+        except driver.IntegrityError as e:
+            report_error("Cannot enter duplicate values, Values already present!", e)
+        except driver.Error as e:
+            report_error("Database error occurred", e)
+        except Exception as e:
+            report_error("An unexpected exception occurred", e)
+
+
+def report_header(report):
+    #which snapshot is on screen, plus every report as CSV in one click
+    if report is None:
+        return
+    col1, col2 = st.columns([4, 1])
+    col1.caption(f"Report snapshot {report.version}, computed {report.created_at:%Y-%m-%d %H:%M:%S}")
+    col2.download_button("Export all reports", report.export_zip(), file_name=f"fwms_reports_{report.version}.zip",
+                         mime="application/zip", key=f"export_{report.version}")
+
+
+def render_details():
+    #1. Food providers in each city
+    try:
+        report = latest_report()
+        details = report.details if report is not None else load_listing_details()
+        report_header(report)
+
+        st.subheader("Food providers count in each city")
+        st.dataframe(details.providers_per_city, hide_index=True)        
+
+        #Food receivers in each city
+        st.subheader("Food receivers count in each city")
+        st.dataframe(details.receivers_per_city, hide_index=True)
+
+        #2.Which type of food provider (restaurant, grocery store, etc.) contributes the most food?
+        st.subheader("Food provider type that contributes the most food")
+        st.dataframe(details.provider_types, hide_index=True)
+
+        #4.Which receivers have claimed the most food?
+        st.subheader("Receivers who have claimed the most food")
+        st.dataframe(details.top_receivers, hide_index=True)
+
+        #5. Food Listings & Availability 
+        #total quantity of food available from all providers
+        st.subheader("Total quantity of food available from all providers")
+        st.dataframe(details.total_quantity, hide_index=True)
+
+        #6.Which city has the highest number of food listings?
+        st.subheader("Cities with highest number of food listings")
+        st.dataframe(details.top_locations, hide_index=True)
+
+        #7.most commonly available food types
+        st.subheader("Most commonly available food types")
+        st.dataframe(details.food_types, hide_index=True)
+        
+        #8.How many food claims have been made for each food item
+        st.subheader("Food claims for each food item")
+        st.dataframe(details.food_item_claims, hide_index=True)
+
+         #9 Which provider has had the highest number of successful food claims
+        st.subheader("Provider with highest number of successful food claims")
+        st.dataframe(details.top_provider, hide_index=True)
+
+        #10 What percentage of food claims are completed vs. pending vs. canceled
+        st.subheader("Percentage of food claim status")
+        st.dataframe(details.claim_status, hide_index=True)
+       
+        #11 What is the average quantity of food claimed per receiver
+        st.subheader("Average quantity of food claimed per receiver")
+        st.dataframe(details.avg_quantity_per_receiver, hide_index=True)
+
+        #12 Which meal type (breakfast, lunch, dinner, snacks) is claimed the most
+        st.subheader("Meal type that was claimed the most")
+        st.dataframe(details.meal_type_claims, hide_index=True)
+        
+        #13 total quantity of food donated by each provider
+        st.subheader("Total quantity of food donated by each provider")
+        st.dataframe(details.quantity_per_provider, hide_index=True)
+
+    except Exception as e:
+        report_error("Unexpected error occurred", e)
+
+
+def render_visualisations():
+    import plotly.express as px
+
+    try:
+        #from the latest report snapshot, or computed in memory from the columnar snapshot without one
+        report = latest_report()
+        if report is not None:
+            charts = report.charts
+        else:
+            snapshot = get_snapshot()
+            charts = {name: getattr(snapshot, name)() for name in CHART_REPORTS}
+        report_header(report)
+        col1, col2, col3 = st.columns([3, 3, 3])  # Adjust ratio as needed
+
+        with col1:    
+            #Most commonly available food types
+            fig = px.pie(charts["food_types"], names='Food_type', values='Count', title='Most commonly available food types')
+            st.plotly_chart(fig)
+                                 
+            #Food claims for each food item        
+            st.write("**Food claims for each food item**")
+            st.bar_chart(charts["food_item_claims"].set_index('Food_Name'), color='#3357FF')
+    
+        with col2:
+            
+            #Cities with highest number of food listings
+            st.write("**Cities with highest number of food listings**")
+            st.bar_chart(charts["top_locations"].set_index('Location'), color='#33FF57')  
+             
+            #Percentage of food claim status
+            fig = px.pie(charts["claim_status"], names='status', values='Percentage', title='Percentage of food claim status')
+            st.plotly_chart(fig)
+            
+        with col3:
+            #Meal type that got claimed the most                
+            fig = px.pie(charts["meal_type_claims"], names='Meal_Type', values='ClaimCount', title='Meal type that got claimed the most')
+            st.plotly_chart(fig)
+
+            #Food provider type that contributes the most food
+            st.write("**Food provider type that contributes the most food**")
+            st.bar_chart(charts["provider_types"].set_index('Provider_type'),color='#FF5733')  
+    
+    except Exception as e:
+        report_error("Unexpected error occurred", e)
+
+
+def render_suggestions():
+    #nearest available food for one receiver, answered from the in-process match index
+    try:
+        index = get_index()
+        st.subheader("Suggested food")
+        receiver_id = int(st.number_input("Receiver ID", min_value=1, step=1, key="suggest_receiver"))
+        limit = st.slider("Number of suggestions", 5, 50, 10, key="suggest_limit")
+        if receiver_id not in index.receivers:
+            st.warning("No receiver found with this ID.")
+            return
+        name, city = index.receivers[receiver_id]
+        st.caption(f"{name}, {city}")
+        suggestions = index.suggest(receiver_id, limit)
+        if not suggestions:
+            st.info("No available food right now.")
+        else:
+            st.dataframe(suggestions_frame(suggestions), hide_index=True)
+
+    except Exception as e:
+        report_error("An unexpected error occurred", e)
+
+
+TABS = {
+    "Food Listings": ('list-ul', render_listings),
+    "Manage Food Claims": ('pencil-square', render_claims),
+    "Listing Details": ('table', render_details),
+    "Data Visualisations": ('bar-chart', render_visualisations),
+    "Suggested Food": ('geo-alt', render_suggestions),
+}
+
+
+def render():
+    tab = option_menu(None, list(TABS), icons=[icon for icon, _ in TABS.values()],
+                      orientation="horizontal", key="management_tab")
+    with page_render(f"Food Waste Management / {tab}"):
+        TABS[tab][1]()
@@ -0,0 +1,158 @@
+"""Thread-safe pool of reusable DB-API connections.
+
+The pool only needs a zero-argument ``connect`` callable, so it works the same
+with pyodbc against SQL Server as with sqlite3 for local runs.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, size=5, timeout=30.0, idle_timeout=300.0,
+                 ping_after=30.0, ping_query="select 1"):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.ping_query = ping_query
+
+        self._idle = []          # [(conn, last_used)], most recently used last
+        self._open = 0           # idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.ping_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def evict_idle(self):
+        #close connections that sat unused for longer than idle_timeout
+        now = time.monotonic()
+        with self._cond:
+            stale = [conn for conn, last in self._idle if now - last > self.idle_timeout]
+            self._idle = [(conn, last) for conn, last in self._idle if now - last <= self.idle_timeout]
+            self._open -= len(stale)
+            if stale:
+                self._cond.notify_all()
+        for conn in stale:
+            self._close(conn)
+        return len(stale)
+
+    def acquire(self):
+        self.evict_idle()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No free connection after {self.timeout}s (pool size {self.size})")
+                self._cond.wait(remaining)
+
+        #health check connections that have been idle for a while
+        if conn is not None and time.monotonic() - last_used > self.ping_after and not self._healthy(conn):
+            self._close(conn)
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn, broken=False):
+        if not broken:
+            #drop any open transaction so the next user starts clean
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            if broken or self._closed:
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if broken or self._closed:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        #re-entrant per thread: nested checkouts reuse the connection already held
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self.acquire()
+        self._local.conn, self._local.depth = conn, 1
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._local.conn = None
+            self.release(conn, broken=broken)
+
+    @contextmanager
+    def session(self):
+        #hold one connection for every query the current thread (Streamlit session run) issues
+        with self.connection() as conn:
+            yield conn
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {"size": self.size, "open": self._open, "idle": idle, "in_use": self._open - idle}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
@@ -0,0 +1,136 @@
+"""Process-wide reference data for the claim forms: food listings, receivers and statuses.
+
+Each table is loaded once per process together with a version: its row count
+and highest id. Every CHECK_INTERVAL seconds, a single cheap query reads the
+current versions. When a table only grew, just the rows past the loaded
+highest id are read and merged in. Any other change (rows removed, or a count
+that does not add up) reloads the table. The
+forms never get the full id lists. search() filters in process, by id prefix
+or by name/location text, and returns at most `limit` options for a
+selectbox.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from fwms.db import run_query
+
+VERSION_QUERY = """
+select
+    (select count(*) from food_listings) as FoodCount,
+    (select max(Food_ID) from food_listings) as FoodMax,
+    (select count(*) from receivers) as ReceiverCount,
+    (select max(Receiver_ID) from receivers) as ReceiverMax,
+    (select count(distinct Status) from claims) as StatusCount
+"""
+
+SOURCES = {
+    #kind -> (query, id column, label columns, version columns)
+    "food": ("select Food_ID, Food_Name, Location from food_listings", "Food_ID", ["Food_Name", "Location"], ("FoodCount", "FoodMax")),
+    "receiver": ("select Receiver_ID, Name, City from receivers", "Receiver_ID", ["Name", "City"], ("ReceiverCount", "ReceiverMax")),
+}
+STATUS_QUERY = "select distinct Status from claims order by Status"
+
+CHECK_INTERVAL = 30
+SEARCH_LIMIT = 50
+
+
+def label_series(df, id_column, label_columns):
+    #"name, location" per id, built column-wise rather than row by row
+    text = df[label_columns[0]].astype(str)
+    for column in label_columns[1:]:
+        text = text + ", " + df[column].astype(str)
+    return pd.Series(text.to_numpy(), index=df[id_column].to_numpy())
+
+
+class Lookup:
+    """Ids with display labels, plus the ids as sorted strings for prefix search."""
+
+    def __init__(self, labels):
+        self.labels = labels.sort_index()
+        self.id_text = np.sort(self.labels.index.to_numpy().astype(str))
+
+    @classmethod
+    def from_frame(cls, df, id_column, label_columns):
+        return cls(label_series(df, id_column, label_columns))
+
+    def extended(self, df, id_column, label_columns):
+        #a new Lookup with df's rows added; sessions still holding this one keep a consistent view
+        return Lookup(pd.concat([self.labels, label_series(df, id_column, label_columns)]))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, value):
+        return value in self.labels.index
+
+    def label(self, value):
+        return f"{value} - {self.labels.get(value, 'unknown')}"
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        text = (text or "").strip()
+        if not text:
+            return self.labels.index[:limit].tolist()
+        if text.isdigit():
+            #ids whose decimal form starts with the digits typed so far, exact match first
+            lo, hi = np.searchsorted(self.id_text, [text, text + "\uffff"])
+            return sorted(int(value) for value in self.id_text[lo:hi][:limit])
+        matches = self.labels[self.labels.str.contains(text, case=False, regex=False)]
+        return matches.index[:limit].tolist()
+
+
+class ReferenceData:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = {}           # kind -> Lookup
+        self.statuses = []
+        self.versions = {}          # kind -> version tuple it was loaded at
+        self.checked_at = 0.0
+
+    def refresh(self, force=False):
+        #reload only what changed since the last check; at most one check per CHECK_INTERVAL
+        with self._lock:
+            if not force and time.time() - self.checked_at < CHECK_INTERVAL:
+                return
+            current = run_query(VERSION_QUERY, ttl=0, primary=True).iloc[0]
+            for kind, (query, id_column, label_columns, version_columns) in SOURCES.items():
+                version = tuple(None if pd.isna(current[c]) else int(current[c]) for c in version_columns)
+                loaded = self.versions.get(kind)
+                if not force and loaded == version:
+                    continue
+                if not force and self._grew(loaded, version):
+                    added = run_query(f"{query} where {id_column} > ?", (loaded[1],), ttl=0, primary=True)
+                    if len(added) == version[0] - loaded[0]:
+                        self.lookups[kind] = self.lookups[kind].extended(added, id_column, label_columns)
+                        self.versions[kind] = version
+                        continue
+                self.lookups[kind] = Lookup.from_frame(run_query(query, ttl=0, primary=True), id_column, label_columns)
+                self.versions[kind] = version
+            status_version = (int(current["StatusCount"]),)
+            if force or self.versions.get("status") != status_version:
+                self.statuses = run_query(STATUS_QUERY, ttl=0, primary=True)['Status'].tolist()
+                self.versions["status"] = status_version
+            self.checked_at = time.time()
+
+    @staticmethod
+    def _grew(loaded, version):
+        #only inserts past the loaded highest id happened (ids are identity columns, so new rows sort last)
+        return (loaded is not None and None not in loaded and None not in version
+                and version[0] > loaded[0] and version[1] > loaded[1])
+
+    def lookup(self, kind):
+        self.refresh()
+        return self.lookups[kind]
+
+    def claim_statuses(self):
+        self.refresh()
+        return self.statuses
+
+
+@st.cache_resource
+def get_reference():
+    return ReferenceData()
@@ -0,0 +1,265 @@
+"""Persistent report snapshots for the Listing Details and Data Visualisations tabs.
+
+A scheduler computes all thirteen Listing Details reports and the six chart
+frames every `interval` seconds. Each report is written as an Arrow IPC file
+into a new version directory:
+
+    fwms_reports/
+        LATEST                          # name of the newest complete version
+        v20261018T120000123456/
+            manifest.json               # version, created_at, rows per report
+            details.top_provider.arrow
+            charts.food_types.arrow
+            ...
+
+A version is written under a temporary name and renamed when complete, and
+LATEST is replaced atomically, so readers never see a half-written snapshot.
+The newest `keep` versions are kept. Readers memory-map the files and cache
+the frames per process until LATEST moves. A viewer therefore costs a file
+stat, and a refresh costs one computation per interval. When several app
+instances share the directory, an instance skips its run if another one
+wrote a fresh version recently.
+
+Without pyarrow, or before the first snapshot exists, the tabs compute their
+reports live as before.
+
+    python -m fwms.reports build            # compute a snapshot now
+    python -m fwms.reports list             # versions on disk
+    python -m fwms.reports export out.zip   # the latest version as CSV files
+"""
+import datetime
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field, fields
+
+import streamlit as st
+
+from fwms.analytics import ListingDetails, load_listing_details
+from fwms.db import load_settings
+from fwms.metrics import instrumented
+from fwms.snapshot import get_snapshot
+
+logger = logging.getLogger("fwms.reports")
+
+CHART_REPORTS = ["food_types", "food_item_claims", "top_locations", "provider_types", "claim_status", "meal_type_claims"]
+
+PATH = "fwms_reports"
+INTERVAL = 5 * 60
+KEEP = 5
+
+
+def _settings():
+    settings = load_settings("reports")
+    return {
+        "path": os.environ.get("FWMS_REPORTS_PATH") or settings.get("path", PATH),
+        "interval": float(settings.get("interval", INTERVAL)),
+        "keep": int(settings.get("keep", KEEP)),
+        "enabled": settings.get("enabled", True),
+    }
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        return None
+    return pa
+
+
+@dataclass
+class Report:
+    version: str
+    created_at: datetime.datetime
+    details: ListingDetails
+    charts: dict                                        # chart name -> DataFrame
+    _export: bytes = field(default=None, repr=False)
+
+    def frames(self):
+        yield from ((f"details.{f.name}", getattr(self.details, f.name)) for f in fields(ListingDetails))
+        yield from ((f"charts.{name}", df) for name, df in self.charts.items())
+
+    def export_zip(self):
+        #every report as CSV in one zip; built once per version and process
+        if self._export is None:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, df in self.frames():
+                    archive.writestr(f"{name}.csv", df.to_csv(index=False))
+            self._export = buffer.getvalue()
+        return self._export
+
+
+def compute_report():
+    snapshot = get_snapshot()
+    charts = {name: getattr(snapshot, name)() for name in CHART_REPORTS}
+    created_at = datetime.datetime.now()
+    return Report(f"v{created_at:%Y%m%dT%H%M%S%f}", created_at, load_listing_details(), charts)
+
+
+def versions(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted(name for name in os.listdir(path)
+                  if name.startswith("v") and os.path.exists(os.path.join(path, name, "manifest.json")))
+
+
+def latest_version(path):
+    try:
+        with open(os.path.join(path, "LATEST")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_report(report, path, keep=KEEP):
+    pa = _arrow()
+    if pa is None:
+        raise RuntimeError("Report snapshots need pyarrow (pip install pyarrow)")
+    os.makedirs(path, exist_ok=True)
+    staging = os.path.join(path, f".{report.version}.tmp")
+    os.makedirs(staging)
+    manifest = {"version": report.version, "created_at": report.created_at.isoformat(), "reports": {}}
+    for name, df in report.frames():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        #uncompressed IPC files, so readers can memory-map them
+        with pa.OSFile(os.path.join(staging, f"{name}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        manifest["reports"][name] = len(df)
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, os.path.join(path, report.version))
+
+    pointer = os.path.join(path, "LATEST.tmp")
+    with open(pointer, "w") as f:
+        f.write(report.version)
+    os.replace(pointer, os.path.join(path, "LATEST"))
+
+    for old in versions(path)[:-keep]:
+        shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+
+def read_report(path, version):
+    pa = _arrow()
+    directory = os.path.join(path, version)
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+
+    def frame(name):
+        with pa.memory_map(os.path.join(directory, f"{name}.arrow"), "r") as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    details = ListingDetails(**{f.name: frame(f"details.{f.name}") for f in fields(ListingDetails)})
+    charts = {name: frame(f"charts.{name}") for name in CHART_REPORTS}
+    return Report(version, datetime.datetime.fromisoformat(manifest["created_at"]), details, charts)
+
+
+@instrumented("build_report")
+def build_report(path=None, keep=None):
+    settings = _settings()
+    report = compute_report()
+    write_report(report, path or settings["path"], keep or settings["keep"])
+    return report
+
+
+@st.cache_resource
+def _loaded():
+    return {"version": None, "report": None}
+
+
+_load_lock = threading.Lock()
+
+
+def latest_report():
+    #the newest snapshot, read once per process per version; None means compute live
+    settings = _settings()
+    if _arrow() is None or not settings["enabled"]:
+        return None
+    version = latest_version(settings["path"])
+    if version is None:
+        with _load_lock:
+            #first use anywhere: one session builds, the others wait for it
+            if latest_version(settings["path"]) is None:
+                build_report(settings["path"], settings["keep"])
+            version = latest_version(settings["path"])
+    loaded = _loaded()
+    if loaded["version"] != version:
+        with _load_lock:
+            if loaded["version"] != version:
+                loaded["report"] = read_report(settings["path"], version)
+                loaded["version"] = version
+    return loaded["report"]
+
+
+class Scheduler(threading.Thread):
+
+    def __init__(self, path, interval=INTERVAL, keep=KEEP):
+        super().__init__(name="fwms-reports", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.keep = keep
+        self.last_run = None
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                latest = latest_version(self.path)
+                age = time.time() - os.path.getmtime(os.path.join(self.path, latest, "manifest.json")) if latest else None
+                #another app instance sharing the directory may already have refreshed it
+                if age is None or age >= self.interval * 0.9:
+                    build_report(self.path, self.keep)
+                    self.last_run = datetime.datetime.now()
+            except Exception:
+                logger.exception("Building the report snapshot failed")
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+@st.cache_resource
+def start_report_scheduler():
+    #one scheduler per server process; None when disabled or pyarrow is missing
+    settings = _settings()
+    if not settings["enabled"] or _arrow() is None:
+        return None
+    scheduler = Scheduler(settings["path"], settings["interval"], settings["keep"])
+    scheduler.start()
+    return scheduler
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "list"
+    path = _settings()["path"]
+    if command == "build":
+        report = build_report(path)
+        print(f"wrote {report.version}")
+    elif command == "list":
+        latest = latest_version(path)
+        for version in versions(path):
+            print(version + ("  (latest)" if version == latest else ""))
+    elif command == "export" and len(argv) > 2:
+        version = latest_version(path)
+        if version is None:
+            print("no report snapshot yet, run: python -m fwms.reports build")
+            return 1
+        with open(argv[2], "wb") as f:
+            f.write(read_report(path, version).export_zip())
+        print(f"exported {version} to {argv[2]}")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,180 @@
+"""Create and fill a local SQLite database with synthetic data.
+
+    python -m fwms.seed local.db --listings 1000000 --claims 1000000
+
+Rows are generated lazily and written with executemany in chunks, so
+millions of listings and claims need little memory. Point the app at the
+result with FWMS_BACKEND=sqlite FWMS_SQLITE_PATH=local.db.
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+
+SCHEMA = """
+create table providers (
+    Provider_ID integer primary key,
+    Name text not null,
+    Type text,
+    Address text,
+    City text,
+    Contact text
+);
+create table receivers (
+    Receiver_ID integer primary key,
+    Name text not null,
+    Type text,
+    City text,
+    Contact text
+);
+create table cities (
+    City text primary key,
+    Latitude real,
+    Longitude real
+);
+create table food_listings (
+    Food_ID integer primary key,
+    Food_Name text,
+    Quantity integer,
+    Expiry_Date date,
+    Provider_ID integer references providers (Provider_ID),
+    Provider_Type text,
+    Location text,
+    Food_Type text,
+    Meal_Type text
+);
+create table claims (
+    Claim_ID integer primary key autoincrement,
+    Food_ID integer references food_listings (Food_ID),
+    Receiver_ID integer references receivers (Receiver_ID),
+    Status text,
+    Timestamp timestamp
+);
+"""
+
+#created after the bulk load, which is much faster than maintaining them row by row
+INDEXES = """
+create index ix_food_listings_provider on food_listings (Provider_ID);
+create index ix_food_listings_location on food_listings (Location);
+create index ix_food_listings_provider_type on food_listings (Provider_Type);
+create index ix_food_listings_food_type on food_listings (Food_Type);
+create index ix_food_listings_food_name on food_listings (Food_Name);
+create index ix_food_listings_expiry on food_listings (Expiry_Date);
+create index ix_claims_food on claims (Food_ID);
+create index ix_claims_receiver on claims (Receiver_ID);
+create index ix_claims_status on claims (Status);
+"""
+
+CITIES = ["New Jessica", "East Sheena", "Lake Jesusview", "Mendezmouth", "South Kathryn",
+          "Port Charlesmouth", "West Andrew", "North Keith", "Lake Michael", "South Christopher",
+          "Jamesview", "Davidland", "New Carol", "Port Sarah", "East Robert", "Williamsburgh"]
+PROVIDER_TYPES = ["Restaurant", "Grocery Store", "Supermarket", "Catering Service"]
+RECEIVER_TYPES = ["NGO", "Community Center", "Shelter", "Individual"]
+FOOD_NAMES = ["Bread", "Rice", "Soup", "Fruits", "Vegetables", "Dairy", "Chicken", "Fish", "Pasta", "Salad"]
+FOOD_TYPES = ["Vegetarian", "Non-Vegetarian", "Vegan"]
+MEAL_TYPES = ["Breakfast", "Lunch", "Dinner", "Snacks"]
+STATUSES = ["Pending", "Completed", "Cancelled"]
+
+CHUNKSIZE = 10000
+
+
+def _phone(rng):
+    return f"+1-{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+
+
+def providers(n, rng):
+    for i in range(1, n + 1):
+        yield (i, f"Provider {i}", rng.choice(PROVIDER_TYPES), f"{rng.randint(1, 9999)} Main Street",
+               rng.choice(CITIES), _phone(rng))
+
+
+def receivers(n, rng):
+    for i in range(1, n + 1):
+        yield (i, f"Receiver {i}", rng.choice(RECEIVER_TYPES), rng.choice(CITIES), _phone(rng))
+
+
+def cities(rng):
+    #scattered over a region a few hundred km across, for the matching subsystem
+    for city in CITIES:
+        yield (city, round(rng.uniform(39.0, 42.0), 5), round(rng.uniform(-77.0, -72.0), 5))
+
+
+def listings(n, n_providers, provider_types, rng, today):
+    for i in range(1, n + 1):
+        provider_id = rng.randint(1, n_providers)
+        yield (i, rng.choice(FOOD_NAMES), rng.randint(1, 50), today + datetime.timedelta(days=rng.randint(-30, 30)),
+               provider_id, provider_types[provider_id], rng.choice(CITIES), rng.choice(FOOD_TYPES), rng.choice(MEAL_TYPES))
+
+
+def claims(n, n_listings, n_receivers, rng, now):
+    for _ in range(n):
+        stamp = now - datetime.timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        yield (rng.randint(1, n_listings), rng.randint(1, n_receivers), rng.choice(STATUSES), stamp)
+
+
+def _insert(conn, sql, rows):
+    count = 0
+    while True:
+        chunk = list(itertools.islice(rows, CHUNKSIZE))
+        if not chunk:
+            return count
+        conn.executemany(sql, chunk)
+        count += len(chunk)
+
+
+def seed(path, n_providers=1000, n_receivers=1000, n_listings=10000, n_claims=10000, random_seed=42, replace=False):
+    if os.path.exists(path):
+        if not replace:
+            raise FileExistsError(f"{path} already exists, pass replace=True (--replace) to overwrite it")
+        os.remove(path)
+
+    rng = random.Random(random_seed)
+    now = datetime.datetime.now().replace(microsecond=0)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("pragma journal_mode = wal")
+        conn.execute("pragma synchronous = off")
+        conn.executescript(SCHEMA)
+
+        provider_rows = list(providers(n_providers, rng))
+        provider_types = {row[0]: row[2] for row in provider_rows}
+        counts = {
+            "providers": _insert(conn, "insert into providers values (?, ?, ?, ?, ?, ?)", iter(provider_rows)),
+            "receivers": _insert(conn, "insert into receivers values (?, ?, ?, ?, ?)", receivers(n_receivers, rng)),
+            "cities": _insert(conn, "insert into cities values (?, ?, ?)", cities(random.Random(random_seed))),
+            "food_listings": _insert(conn, "insert into food_listings values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     listings(n_listings, n_providers, provider_types, rng, now.date())),
+            "claims": _insert(conn, "insert into claims (Food_ID, Receiver_ID, Status, Timestamp) values (?, ?, ?, ?)",
+                              claims(n_claims, n_listings, n_receivers, rng, now)),
+        }
+        conn.executescript(INDEXES)
+        conn.commit()
+        conn.execute("analyze")
+    finally:
+        conn.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fwms.seed", description="Generate a local SQLite database")
+    parser.add_argument("path")
+    parser.add_argument("--providers", type=int, default=1000)
+    parser.add_argument("--receivers", type=int, default=1000)
+    parser.add_argument("--listings", type=int, default=10000)
+    parser.add_argument("--claims", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replace", action="store_true", help="overwrite an existing database file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = seed(args.path, args.providers, args.receivers, args.listings, args.claims, args.seed, args.replace)
+    print(", ".join(f"{table}: {n:,}" for table, n in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Columnar in-memory snapshot for the Data Visualisations tab.
+
+food_listings, claims, providers and receivers are loaded once per process,
+with categorical dtypes for the low-cardinality text columns and downcast
+integer ids. After that, refresh() only pulls claims whose timestamp moved
+past the watermark and listings with ids past the last one loaded. A full
+reload runs every FULL_RELOAD_INTERVAL to pick up deletes made elsewhere.
+The charts are vectorized group-bys on these frames; a rerun of the tab
+costs at most the two small incremental queries, once per REFRESH_INTERVAL.
+"""
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+from fwms.db import run_query
+
+LISTING_COLUMNS = "Food_ID, Food_Name, Quantity, Provider_ID, Provider_Type, Location, Food_Type, Meal_Type"
+CLAIM_COLUMNS = "Claim_ID, Food_ID, Receiver_ID, Status, Timestamp"
+CATEGORICAL = ["Food_Name", "Provider_Type", "Location", "Food_Type", "Meal_Type", "Status", "Type", "City"]
+
+REFRESH_INTERVAL = 30
+FULL_RELOAD_INTERVAL = 10 * 60
+
+
+def compact(df):
+    #categoricals for repeated strings, smallest integer type for ids and quantities
+    for column in df.columns:
+        if column in CATEGORICAL:
+            df[column] = df[column].astype("category")
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    return df
+
+
+def _counts(series, label, value, top=None):
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+    if top is not None:
+        counts = counts.head(top)
+    return pd.DataFrame({label: counts.index.astype(object), value: counts.to_numpy()})
+
+
+class ColumnarSnapshot:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.listings = self.claims = self.providers = self.receivers = None
+        self.claims_watermark = None
+        self.last_food_id = None
+        self.loaded_at = self.refreshed_at = 0.0
+
+    @property
+    def loaded(self):
+        return self.listings is not None
+
+    def load(self):
+        listings = compact(run_query(f"select {LISTING_COLUMNS} from food_listings", ttl=0, primary=True))
+        claims = compact(run_query(f"select {CLAIM_COLUMNS} from claims", ttl=0, primary=True))
+        providers = compact(run_query("select Provider_ID, Name, Type, City from providers", ttl=0, primary=True))
+        receivers = compact(run_query("select Receiver_ID, Name, Type, City from receivers", ttl=0, primary=True))
+        with self._lock:
+            self.listings, self.claims, self.providers, self.receivers = listings, claims, providers, receivers
+            self.claims_watermark = claims['Timestamp'].max() if len(claims) else None
+            self.last_food_id = int(listings['Food_ID'].max()) if len(listings) else 0
+            self.loaded_at = self.refreshed_at = time.time()
+
+    def refresh(self):
+        #claims touched since the watermark replace their old rows; new listings are appended
+        if self.claims_watermark is None:
+            changed = run_query(f"select {CLAIM_COLUMNS} from claims", ttl=0, primary=True)
+        else:
+            changed = run_query(f"select {CLAIM_COLUMNS} from claims where Timestamp >= ?",
+                                (self.claims_watermark.to_pydatetime(),), ttl=0, primary=True)
+        new_listings = run_query(f"select {LISTING_COLUMNS} from food_listings where Food_ID > ?", (self.last_food_id,), ttl=0, primary=True)
+
+        with self._lock:
+            if len(changed):
+                kept = self.claims[~self.claims['Claim_ID'].isin(changed['Claim_ID'])]
+                self.claims = compact(pd.concat([kept, changed], ignore_index=True))
+                self.claims_watermark = self.claims['Timestamp'].max()
+            if len(new_listings):
+                self.listings = compact(pd.concat([self.listings, new_listings], ignore_index=True))
+                self.last_food_id = int(self.listings['Food_ID'].max())
+            self.refreshed_at = time.time()
+
+    def remove_claims(self, claim_ids):
+        #deletes leave no timestamp behind, so the claims service reports them directly
+        with self._lock:
+            if self.claims is not None:
+                self.claims = self.claims[~self.claims['Claim_ID'].isin(list(claim_ids))]
+
+    def memory_usage(self):
+        with self._lock:
+            frames = {"food_listings": self.listings, "claims": self.claims,
+                      "providers": self.providers, "receivers": self.receivers}
+            return {name: int(df.memory_usage(deep=True).sum()) for name, df in frames.items() if df is not None}
+
+    #chart frames, with the column names the charts have always used
+
+    def food_types(self):
+        return _counts(self.listings['Food_Type'], 'Food_type', 'Count')
+
+    def food_item_claims(self):
+        return _counts(self.listings['Food_Name'], 'Food_Name', 'Claims')
+
+    def top_locations(self, top=10):
+        return _counts(self.listings['Location'], 'Location', 'Count', top=top)
+
+    def provider_types(self):
+        return _counts(self.listings['Provider_Type'], 'Provider_type', 'FoodProvidedCount')
+
+    def claim_status(self):
+        shares = self.claims['Status'].value_counts(normalize=True)
+        shares = shares[shares > 0]
+        return pd.DataFrame({'status': shares.index.astype(object), 'Percentage': (shares.to_numpy() * 100).round(2)})
+
+    def meal_type_claims(self):
+        #claims -> listing meal type through an index lookup instead of a join
+        meal_type = self.listings.set_index('Food_ID')['Meal_Type']
+        return _counts(self.claims['Food_ID'].map(meal_type), 'Meal_Type', 'ClaimCount')
+
+
+@st.cache_resource
+def _shared_snapshot():
+    return ColumnarSnapshot()
+
+
+_refresh_lock = threading.Lock()
+
+
+def get_snapshot():
+    #one snapshot per process; at most one session refreshes it at a time
+    snapshot = _shared_snapshot()
+    now = time.time()
+    if not snapshot.loaded or now - snapshot.loaded_at > FULL_RELOAD_INTERVAL:
+        with _refresh_lock:
+            if not snapshot.loaded or time.time() - snapshot.loaded_at > FULL_RELOAD_INTERVAL:
+                snapshot.load()
+    elif now - snapshot.refreshed_at > REFRESH_INTERVAL and _refresh_lock.acquire(blocking=False):
+        try:
+            snapshot.refresh()
+        finally:
+            _refresh_lock.release()
+    return snapshot
+
+
+def forget_claims(claim_ids):
+    #called by the claims service after deletes; does not trigger a load
+    _shared_snapshot().remove_claims(claim_ids)
@@ -0,0 +1,79 @@
+"""Paged, projected reads of whole tables for the Contact and Read Claims grids.
+
+Nothing here loads a full table into memory. Grids fetch one keyset page of
+only the selected columns. Downloads stream the table with fetchmany, one
+compacted chunk at a time, so memory stays bounded by the page or chunk
+size however large the table grows.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from fwms.db import read_pool, run_query, translate
+from fwms.snapshot import compact
+
+PAGE_SIZES = [50, 100, 500]
+CHUNKSIZE = 5000
+
+
+@dataclass(frozen=True)
+class TableView:
+    table: str
+    key: str
+    columns: dict       # display name -> column, in display order
+
+    def select_list(self, names):
+        #the key always comes along: it is the page cursor
+        chosen = [name for name in self.columns if name in names] or list(self.columns)
+        parts = [f"{self.key} as Cursor_Key"]
+        for name in chosen:
+            column = self.columns[name]
+            parts.append(column if column == name else f"{column} as {name}")
+        return ", ".join(parts)
+
+
+PROVIDERS = TableView("providers", "Provider_ID", {
+    "City": "City", "ProviderName": "Name", "Address": "Address", "Contact": "Contact", "Type": "Type"})
+RECEIVERS = TableView("receivers", "Receiver_ID", {
+    "Name": "Name", "Type": "Type", "City": "City", "Contact": "Contact"})
+CLAIMS = TableView("claims", "Claim_ID", {
+    "Claim_ID": "Claim_ID", "Food_ID": "Food_ID", "Receiver_ID": "Receiver_ID", "Status": "Status", "Timestamp": "Timestamp"})
+
+
+def count_rows(view):
+    return int(run_query(f"select count(*) as Total from {view.table}")['Total'].iloc[0])
+
+
+def fetch_page(view, names, after=None, page_size=PAGE_SIZES[0], ttl=None):
+    #returns (rows, has_next, last key); the next page starts after the last key of this one
+    where = f" where {view.key} > ?" if after is not None else ""
+    query = f"select top {int(page_size) + 1} {view.select_list(names)} from {view.table}{where} order by {view.key}"
+    df = run_query(query, (after,) if after is not None else None, ttl=ttl)
+    has_next = len(df) > page_size
+    df = df.head(page_size)
+    last = df['Cursor_Key'].iloc[-1].item() if len(df) else after
+    return compact(df.drop(columns='Cursor_Key')), has_next, last
+
+
+def iter_chunks(view, names, chunksize=CHUNKSIZE):
+    #the projected table in compacted chunks, read with fetchmany on one cursor
+    query = f"select {view.select_list(names)} from {view.table} order by {view.key}"
+    with read_pool(query).connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(translate(query))
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield compact(pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns).drop(columns='Cursor_Key'))
+        cursor.close()
+
+
+def write_csv(view, names, out, chunksize=CHUNKSIZE):
+    #streams the projection into out (a path); returns the number of rows written
+    written = 0
+    for i, chunk in enumerate(iter_chunks(view, names, chunksize)):
+        chunk.to_csv(out, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        written += len(chunk)
+    return written
@@ -0,0 +1,20 @@
+"""Shared fixtures: a small seeded SQLite database the app is pointed at."""
+import pytest
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    st = pytest.importorskip("streamlit")
+    pytest.importorskip("pandas")
+    from fwms.seed import seed
+
+    path = str(tmp_path / "test.db")
+    seed(path, n_providers=20, n_receivers=20, n_listings=200, n_claims=200)
+    monkeypatch.setenv("FWMS_BACKEND", "sqlite")
+    monkeypatch.setenv("FWMS_SQLITE_PATH", path)
+    monkeypatch.setenv("FWMS_CHANGE_SOURCE", "local")
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    yield path
+    st.cache_resource.clear()
+    st.cache_data.clear()
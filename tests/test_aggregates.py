@@ -0,0 +1,35 @@
+"""The aggregate store against full SQL group-bys on a seeded SQLite database.
+
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms import aggregates  # noqa: E402
+from fwms.claims import get_claim, insert_claim, update_claim  # noqa: E402
+
+
+def test_first_write_in_process_is_counted_once(database):
+    #nothing has read the store yet: the write must not be added on top of the rebuild that includes it
+    insert_claim(1, 1, "Pending")
+    assert aggregates.check_consistency(aggregates.get_aggregates()) == {}
+
+
+def test_write_on_stale_store_is_counted_once(database):
+    aggregates.get_aggregates()
+    aggregates.mark_stale()
+    insert_claim(1, 1, "Completed")
+    claim = get_claim(1)
+    update_claim(claim.claim_id, claim.food_id, claim.receiver_id, "Cancelled", claim.timestamp)
+    assert aggregates.check_consistency(aggregates.get_aggregates()) == {}
+
+
+def test_write_on_fresh_store_applies_delta(database):
+    store = aggregates.get_aggregates()
+    before = store.snapshot()["status_counts"].get("Pending", 0)
+    insert_claim(1, 1, "Pending")
+    assert aggregates.get_aggregates() is store
+    assert store.snapshot()["status_counts"]["Pending"] == before + 1
+    assert aggregates.check_consistency(store) == {}
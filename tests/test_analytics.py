@@ -0,0 +1,35 @@
+"""The process-wide Home KPIs on a seeded SQLite database."""
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms.analytics import live_kpis, load_kpis  # noqa: E402
+from fwms.db import get_cache, get_connection, invalidate  # noqa: E402
+
+
+def execute(sql, params=()):
+    with get_connection() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def test_kpis_reload_when_a_kpi_table_is_invalidated(database):
+    live = live_kpis()
+    before = live.current()
+    execute("insert into providers (Name, Type, Address, City, Contact) values ('New', 'Restaurant', 'x', 'y', 'z')")
+    assert live.current() == before
+    invalidate("providers")
+    assert live.current().providers == before.providers + 1
+
+
+def test_kpis_reload_when_older_than_max_age(database):
+    live = live_kpis()
+    before = live.current()
+    #a change the feed never reports, made by another instance
+    execute("update food_listings set Quantity = Quantity + 1000 where Food_ID = (select min(Food_ID) from food_listings where Expiry_Date >= date('now', 'localtime'))")
+    get_cache().invalidate("claims")
+    assert live.current() == before
+    live.loaded_at -= live.max_age + 1
+    assert live.current().total_quantity == before.total_quantity + 1000
+    assert live.current() == load_kpis()
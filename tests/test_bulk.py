@@ -0,0 +1,29 @@
+"""Row validation of the bulk claim import."""
+import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from fwms.bulk import validate_chunk  # noqa: E402
+
+KEYS = ({1}, {2}, {"Pending"})
+
+
+def test_rows_are_checked_against_the_key_sets():
+    df = pd.DataFrame({"food_id": [1, 9, 1, 1.5], "Receiver_ID": [2, 2, 3, 2], "Status": ["Pending"] * 4})
+    rows, rejects = validate_chunk(df, 10, KEYS)
+    assert list(rows) == [10]
+    assert [(r.row, r.reason) for r in rejects] == [
+        (11, "Unknown Food_ID 9"), (12, "Unknown Receiver_ID 3"), (13, "Food_ID is not an integer")]
+
+
+def test_unparsable_timestamp_rejects_the_row():
+    df = pd.DataFrame({"Food_ID": [1, 1, 1], "Receiver_ID": [2, 2, 2], "Status": ["Pending"] * 3,
+                       "Timestamp": ["2024-01-02 10:00:00", "garbage", None]})
+    before = datetime.datetime.now()
+    rows, rejects = validate_chunk(df, 1, KEYS)
+    assert rows[1][3] == datetime.datetime(2024, 1, 2, 10, 0)
+    assert [(r.row, r.reason) for r in rejects] == [(2, "Timestamp 'garbage' is not a date")]
+    #a blank timestamp means now
+    assert rows[3][3] >= before
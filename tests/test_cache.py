@@ -0,0 +1,94 @@
+"""QueryCache: TTL, the LRU byte budget, per-table invalidation and the ttl=0 bypass."""
+import sys
+import time
+
+from fwms.cache import QueryCache, normalize_sql, referenced_tables
+
+
+class Loader:
+
+    def __init__(self, value="rows"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_normalized_statements_share_an_entry():
+    cache, load = QueryCache(), Loader()
+    cache.get_or_load("select * from claims", None, load)
+    cache.get_or_load("SELECT  *\n FROM Claims;", None, load)
+    assert load.calls == 1
+    assert normalize_sql("select 'A  B' from x") == "select 'A  B' from x"
+
+
+def test_entries_expire_after_ttl():
+    cache, load = QueryCache(), Loader()
+    cache.get_or_load("select * from claims", None, load, ttl=0.02)
+    cache.get_or_load("select * from claims", None, load, ttl=0.02)
+    assert load.calls == 1
+    time.sleep(0.03)
+    cache.get_or_load("select * from claims", None, load, ttl=0.02)
+    assert load.calls == 2
+
+
+def test_params_are_part_of_the_key():
+    cache, load = QueryCache(), Loader()
+    cache.get_or_load("select * from claims where Claim_ID = ?", (1,), load)
+    cache.get_or_load("select * from claims where Claim_ID = ?", (2,), load)
+    assert load.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted_over_budget():
+    value = b"x" * 100
+    cache = QueryCache(max_bytes=2 * sys.getsizeof(value))
+    cache.get_or_load("select * from a", None, Loader(value))
+    cache.get_or_load("select * from b", None, Loader(value))
+    cache.get_or_load("select * from a", None, Loader(value))     # a is now the most recent
+    cache.get_or_load("select * from c", None, Loader(value))
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(cache.make_key("select * from b")) is None
+    assert cache.get(cache.make_key("select * from a")) == value
+
+
+def test_result_larger_than_budget_is_not_cached():
+    cache, load = QueryCache(max_bytes=10), Loader(b"x" * 100)
+    cache.get_or_load("select * from a", None, load)
+    cache.get_or_load("select * from a", None, load)
+    assert load.calls == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_drops_only_entries_reading_the_table():
+    cache = QueryCache()
+    assert referenced_tables("select * from claims c join dbo.[food_listings] f on c.Food_ID = f.Food_ID") == {"claims", "food_listings"}
+    cache.get_or_load("select * from claims c join food_listings f on c.Food_ID = f.Food_ID", None, Loader())
+    cache.get_or_load("select * from providers", None, Loader())
+    cache.get_or_load_batch(["select * from receivers", "select * from claims"], lambda: ["r", "c"])
+    assert cache.invalidate("Claims") == 2
+    assert cache.stats()["entries"] == 1
+    assert cache.get(cache.make_key("select * from providers")) == "rows"
+
+
+def test_ttl_zero_always_loads_and_ignores_cached_entries():
+    cache, load = QueryCache(), Loader()
+    cache.get_or_load("select * from claims", None, Loader("old"))
+    assert cache.get_or_load("select * from claims", None, load, ttl=0) == "rows"
+    assert cache.get_or_load("select * from claims", None, load, ttl=0) == "rows"
+    assert load.calls == 2
+    assert cache.get_or_load_batch(["select * from claims"], lambda: ["fresh"], ttl=0) == ("fresh",)
+    assert cache.stats()["entries"] == 1
+
+
+def test_generation_moves_on_invalidate_and_clear():
+    cache = QueryCache()
+    start = cache.generation("providers", "receivers")
+    cache.invalidate("claims")
+    assert cache.generation("providers", "receivers") == start
+    cache.invalidate("Providers")
+    after_invalidate = cache.generation("providers", "receivers")
+    assert after_invalidate != start
+    cache.clear()
+    assert cache.generation("providers", "receivers") != after_invalidate
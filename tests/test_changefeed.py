@@ -0,0 +1,105 @@
+"""The claims change feed: hub and poller with LocalChangeSource, and the timestamp source on SQLite."""
+import datetime
+import time
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms.changefeed import (ChangeHub, ClaimChange, LocalChangeSource, Poller,  # noqa: E402
+                             TimestampChangeSource, apply_changes, completed_delta)
+from fwms.claims import get_claim, insert_claim, update_claim  # noqa: E402
+
+
+def drain_until(feed, predicate, timeout=2.0):
+    #the poller runs on its own thread; collect what it delivers until predicate holds
+    deadline = time.monotonic() + timeout
+    received, lagged = [], False
+    while time.monotonic() < deadline:
+        changes, was_lagged = feed.drain()
+        received.extend(changes)
+        lagged = lagged or was_lagged
+        if predicate(received, lagged):
+            break
+        time.sleep(0.01)
+    return received, lagged
+
+
+@pytest.fixture
+def feed():
+    hub, source = ChangeHub(), LocalChangeSource()
+    poller = Poller(source, hub, interval=0.01)
+    poller.start()
+    yield hub, source
+    poller.stop()
+    poller.join()
+
+
+def test_poller_delivers_local_changes_to_every_subscriber(feed):
+    hub, source = feed
+    first, second = hub.subscribe(), hub.subscribe()
+    change = ClaimChange("upsert", 1, 10, 20, "Pending")
+    source.emit(change)
+    assert drain_until(first, lambda received, _: received)[0] == [change]
+    assert drain_until(second, lambda received, _: received)[0] == [change]
+
+
+def test_subscriber_that_falls_behind_is_told_it_lagged(feed):
+    hub, source = feed
+    subscription = hub.subscribe(max_pending=3)
+    source.emit(*(ClaimChange("upsert", i, 10, 20, "Pending") for i in range(5)))
+    received, lagged = drain_until(subscription, lambda _, lagged: lagged)
+    assert lagged and received == []
+    #drain resets the flag; later changes are delivered again
+    source.emit(ClaimChange("delete", 7))
+    received, lagged = drain_until(subscription, lambda received, _: received)
+    assert received == [ClaimChange("delete", 7)] and not lagged
+
+
+def test_dropped_subscription_leaves_the_hub():
+    hub = ChangeHub()
+    subscription = hub.subscribe()
+    assert hub.subscribers == 1
+    del subscription
+    assert hub.subscribers == 0
+
+
+def test_apply_changes_and_completed_delta():
+    stamp = datetime.datetime(2024, 1, 1)
+    df = pd.DataFrame([(1, 10, 20, "Pending", stamp), (2, 11, 21, "Completed", stamp)],
+                      columns=["Claim_ID", "Food_ID", "Receiver_ID", "Status", "Timestamp"])
+    changes = [ClaimChange("upsert", 1, 10, 20, "Completed", stamp, previous_status="Pending"),
+               ClaimChange("delete", 2, previous_status="Completed"),
+               ClaimChange("upsert", 3, 12, 22, "Pending", stamp, previous_status=None)]
+    patched = apply_changes(df, changes)
+    assert patched["Claim_ID"].tolist() == [1, 3]
+    assert patched["Status"].tolist() == ["Completed", "Pending"]
+    assert completed_delta(changes[:2]) == 0
+    assert completed_delta(changes) is None
+
+
+def test_timestamp_source_reports_new_and_changed_claims(database):
+    source = TimestampChangeSource()
+    assert source.poll() == []
+    assert isinstance(source.watermark, datetime.datetime)
+
+    insert_claim(1, 1, "Pending")
+    inserted = source.poll()
+    assert [(change.food_id, change.receiver_id, change.status) for change in inserted] == [(1, 1, "Pending")]
+    assert source.poll() == []
+
+    claim = get_claim(inserted[0].claim_id)
+    update_claim(claim.claim_id, claim.food_id, claim.receiver_id, "Completed", claim.timestamp)
+    changed = source.poll()
+    assert [(change.claim_id, change.status) for change in changed] == [(claim.claim_id, "Completed")]
+
+
+def test_timestamp_source_skips_changes_this_process_published(database):
+    source = TimestampChangeSource()
+    source.poll()
+    claim = get_claim(1)
+    update_claim(claim.claim_id, claim.food_id, claim.receiver_id, "Cancelled", claim.timestamp)
+    updated = get_claim(1)
+    source.remember([ClaimChange("upsert", 1, updated.food_id, updated.receiver_id, "Cancelled", updated.timestamp)])
+    assert source.poll() == []
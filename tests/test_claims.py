@@ -0,0 +1,47 @@
+"""Optimistic updates and deletes of the claims service on a seeded SQLite database."""
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms.claims import ConcurrentUpdateError, delete_claim, get_claim, transition_status, update_claim  # noqa: E402
+
+
+def test_update_with_current_version_succeeds(database):
+    claim = get_claim(1)
+    update_claim(claim.claim_id, claim.food_id, claim.receiver_id, "Cancelled", claim.timestamp)
+    updated = get_claim(1)
+    assert updated.status == "Cancelled"
+    assert updated.timestamp != claim.timestamp
+
+
+def test_update_with_stale_version_raises(database):
+    stale = get_claim(1)
+    update_claim(stale.claim_id, stale.food_id, stale.receiver_id, "Cancelled", stale.timestamp)
+    with pytest.raises(ConcurrentUpdateError):
+        update_claim(stale.claim_id, stale.food_id, stale.receiver_id, "Completed", stale.timestamp)
+    assert get_claim(1).status == "Cancelled"
+
+
+def test_delete_with_stale_version_raises(database):
+    stale = get_claim(2)
+    update_claim(stale.claim_id, stale.food_id, stale.receiver_id, "Pending", stale.timestamp)
+    with pytest.raises(ConcurrentUpdateError):
+        delete_claim(stale.claim_id, stale.timestamp)
+    assert get_claim(2) is not None
+    delete_claim(2, get_claim(2).timestamp)
+    assert get_claim(2) is None
+
+
+def test_delete_of_missing_claim_raises(database):
+    claim = get_claim(3)
+    delete_claim(3, claim.timestamp)
+    with pytest.raises(ConcurrentUpdateError):
+        delete_claim(3, claim.timestamp)
+
+
+def test_transition_moves_only_claims_in_from_status(database):
+    claims = [get_claim(claim_id) for claim_id in range(1, 21)]
+    pending = [c.claim_id for c in claims if c.status == "Pending"]
+    assert transition_status([c.claim_id for c in claims], "Pending", "Completed") == len(pending)
+    assert all(get_claim(claim_id).status == "Completed" for claim_id in pending)
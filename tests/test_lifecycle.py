@@ -0,0 +1,42 @@
+"""Archiving expired listings, with their claims, on a seeded SQLite database."""
+import datetime
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms import aggregates  # noqa: E402
+from fwms.db import get_connection  # noqa: E402
+from fwms.lifecycle import archive_expired  # noqa: E402
+
+
+def scalar(sql, params=()):
+    with get_connection() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def test_expired_listings_move_to_history_with_their_claims(database):
+    cutoff = datetime.date.today() - datetime.timedelta(days=1)
+    expired = scalar("select count(*) from food_listings where Expiry_Date < ?", (cutoff,))
+    expired_claims = scalar("select count(*) from claims c join food_listings f on c.Food_ID = f.Food_ID where f.Expiry_Date < ?", (cutoff,))
+    listings, claims = scalar("select count(*) from food_listings"), scalar("select count(*) from claims")
+    assert expired and expired_claims
+
+    assert archive_expired(batch_size=10, grace_days=1) == expired
+
+    assert scalar("select count(*) from food_listings where Expiry_Date < ?", (cutoff,)) == 0
+    assert scalar("select count(*) from food_listings") == listings - expired
+    assert scalar("select count(*) from claims") == claims - expired_claims
+    assert scalar("select count(*) from food_listings_history") == expired
+    assert scalar("select count(*) from claims_history") == expired_claims
+    #no claim is left pointing at an archived listing
+    assert scalar("select count(*) from claims c where not exists (select 1 from food_listings f where f.Food_ID = c.Food_ID)") == 0
+    assert aggregates.check_consistency(aggregates.get_aggregates()) == {}
+    assert archive_expired(batch_size=10, grace_days=1) == 0
+
+
+def test_dry_run_moves_nothing(database):
+    listings = scalar("select count(*) from food_listings")
+    assert archive_expired(batch_size=10, grace_days=1, dry_run=True) > 0
+    assert scalar("select count(*) from food_listings") == listings
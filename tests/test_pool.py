@@ -0,0 +1,98 @@
+"""ConnectionPool against SQLite connections; needs nothing beyond the standard library.
+
+    python -m pytest tests
+"""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from fwms.pool import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def connect(tmp_path):
+    path = str(tmp_path / "pool.db")
+    sqlite3.connect(path).close()
+    return lambda: sqlite3.connect(path, check_same_thread=False)
+
+
+def test_checkout_times_out_when_pool_is_exhausted(connect):
+    pool = ConnectionPool(connect, size=1, timeout=0.05)
+    conn = pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_released_connection_is_reused(connect):
+    pool = ConnectionPool(connect, size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.stats() == {"size": 2, "open": 1, "idle": 0, "in_use": 1}
+
+
+def test_idle_connections_are_evicted(connect):
+    pool = ConnectionPool(connect, size=2, idle_timeout=0.01)
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.02)
+    assert pool.evict_idle() == 1
+    assert pool.stats()["open"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("select 1")
+
+
+def test_broken_connection_is_closed_not_reused(connect):
+    pool = ConnectionPool(connect, size=1)
+    conn = pool.acquire()
+    pool.release(conn, broken=True)
+    assert pool.stats()["open"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("select 1")
+    assert pool.acquire() is not conn
+
+
+def test_unhealthy_idle_connection_is_replaced(connect):
+    pool = ConnectionPool(connect, size=1, ping_after=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert replacement.execute("select 1").fetchone() == (1,)
+
+
+def test_connection_is_reentrant_per_thread(connect):
+    pool = ConnectionPool(connect, size=2)
+    other = []
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+            assert pool.stats()["in_use"] == 1
+            #another thread gets a connection of its own
+            thread = threading.Thread(target=lambda: other.append(pool.acquire()))
+            thread.start()
+            thread.join()
+        assert pool.stats()["in_use"] == 2
+    assert other[0] is not outer
+    assert pool.stats()["in_use"] == 1
+
+
+def test_exception_rolls_back_and_returns_connection(connect):
+    pool = ConnectionPool(connect, size=1)
+    with pool.connection() as conn:
+        conn.execute("create table t (x integer)")
+        conn.commit()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("insert into t values (1)")
+            raise RuntimeError("boom")
+    with pool.connection() as conn:
+        assert conn.execute("select count(*) from t").fetchone() == (0,)
+    assert pool.stats() == {"size": 1, "open": 1, "idle": 1, "in_use": 0}
@@ -0,0 +1,47 @@
+"""Replica health checks with a SQLite copy of the seeded database as the replica."""
+import datetime
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from fwms import db  # noqa: E402
+from fwms.pool import ConnectionPool  # noqa: E402
+
+
+@pytest.fixture
+def replica(database, tmp_path, monkeypatch):
+    #claims end half an hour ago on both copies; the replica is a snapshot of the primary at that point
+    cutoff = datetime.datetime.now() - datetime.timedelta(minutes=31)
+    primary = sqlite3.connect(database, detect_types=sqlite3.PARSE_DECLTYPES)
+    primary.execute("delete from claims where Timestamp > ?", (cutoff,))
+    primary.commit()
+    path = str(tmp_path / "replica.db")
+    copy = sqlite3.connect(path)
+    primary.backup(copy)
+    copy.close()
+    replicas = [db.Replica("replica", ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False)))]
+    monkeypatch.setattr(db, "get_replicas", lambda: replicas)
+    yield primary, replicas[0]
+    primary.close()
+
+
+def test_replica_in_sync_is_healthy(replica):
+    _, state = replica
+    db.check_replicas()
+    assert state.lag == 0.0 and state.healthy
+
+
+def test_replica_missing_an_old_write_is_stale(replica):
+    primary, state = replica
+    #one write, committed half an hour ago and only two seconds after the replica's newest claim
+    latest = primary.execute("select max(Timestamp) from claims").fetchone()[0]
+    latest = datetime.datetime.fromisoformat(latest) if isinstance(latest, str) else latest
+    primary.execute("insert into claims (Food_ID, Receiver_ID, Status, Timestamp) values (1, 1, 'Pending', ?)",
+                    (latest + datetime.timedelta(seconds=2),))
+    primary.commit()
+    db.check_replicas()
+    assert state.lag >= 30 * 60
+    assert not state.healthy